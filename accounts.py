@@ -0,0 +1,114 @@
+from solders.instruction import Instruction
+from spl.token.instructions import create_associated_token_account, get_associated_token_address
+
+from config import *
+from constants import *
+from rpc import *
+from decoders import *
+from cache import TTLCache
+
+import asyncio
+import logging
+import time
+
+MINT_DECIMALS_OFFSET = 44
+
+token_account_cache = TTLCache(4096, token_account_ttl)
+# owner -> {"fetched_at": monotonic time, "accounts": {mint: {"account", "amount" (raw), "decimals"}}}
+token_snapshots = {}
+mint_decimals = {}
+
+def create_associated_token_account_idempotent(payer, owner, mint):
+    """CreateIdempotent flavour of the ATA instruction, a no-op if the account already exists."""
+    instruction = create_associated_token_account(payer, owner, mint)
+    return Instruction(instruction.program_id, bytes([1]), instruction.accounts)
+
+def remember_token_account(owner, mint, token_account):
+    token_account_cache.set((str(owner), str(mint)), token_account)
+
+def forget_token_account(owner, mint):
+    token_account_cache.invalidate((str(owner), str(mint)))
+
+async def get_token_account(owner: Pubkey, mint: Pubkey):
+    """Token account of `owner` for `mint`, plus the instruction creating it when it may not exist (else None).
+
+    The associated token account always comes with its idempotent create: it may have been closed outside the app
+    since it was cached (the feed doesn't see closes), and the create is a no-op while it still exists."""
+    associated = get_associated_token_address(owner, mint)
+    create = create_associated_token_account_idempotent(owner, owner, mint)
+    token_account = token_account_cache.get((str(owner), str(mint)))
+    if token_account:
+        return token_account, create if str(token_account) == str(associated) else None
+
+    try:
+        params = [str(owner), {"mint": str(mint)}, {"encoding": "base64", "dataSlice": {"offset": 0, "length": 0}}]
+        accounts = (await rpc_call("getTokenAccountsByOwner", params))["value"]
+    except Exception as e:
+        logging.warning(f"Token account lookup failed, using the associated token account: {e}")
+        accounts = []
+    if accounts:
+        token_account = Pubkey.from_string(accounts[0]["pubkey"])
+        remember_token_account(owner, mint, token_account)
+        return token_account, create if token_account == associated else None
+
+    # idempotent create, so a failed lookup can't make the transaction fail on an existing account
+    return associated, create
+
+async def get_mint_decimals(mints):
+    missing = [mint for mint in set(map(str, mints)) if mint not in mint_decimals]
+    if missing:
+        for mint, data in zip(missing, await get_multiple_accounts(missing)):
+            if data and len(data) >= MINT_LEN:
+                mint_decimals[mint] = data[MINT_DECIMALS_OFFSET]
+    return {str(mint): mint_decimals.get(str(mint)) for mint in mints}
+
+async def load_token_snapshot(owner):
+    """One base64 getTokenAccountsByOwner for every spl token account of `owner`, decoded with ACCOUNT_LAYOUT."""
+    logging.info(f"Loading token accounts")
+    params = [str(owner), {"programId": str(TOKEN_PROGRAM)}, {"encoding": "base64", "commitment": "processed"}]
+    token_accounts = (await rpc_call("getTokenAccountsByOwner", params))["value"]
+    records, valid = bulk_decode(account_blobs(token_accounts), ACCOUNT_LAYOUT, ["mint", "amount"])
+    pubkeys = [entry["pubkey"] for entry, ok in zip(token_accounts, valid) if ok]
+    records = records[valid]
+    mints = [str(Pubkey.from_bytes(bytes(mint))) for mint in records["mint"]]
+    decimals = await get_mint_decimals(mints)
+
+    accounts = {}
+    for token_account, mint, amount in zip(pubkeys, mints, records["amount"]):
+        # first account per mint wins, same as the old per-mint lookups
+        if mint not in accounts:
+            accounts[mint] = {"account": token_account, "amount": int(amount), "decimals": decimals[mint]}
+            remember_token_account(owner, mint, Pubkey.from_string(token_account))
+    token_snapshots[str(owner)] = {"fetched_at": time.monotonic(), "accounts": accounts}
+    return accounts
+
+async def get_token_snapshot(owner, max_age=token_snapshot_ttl):
+    snapshot = token_snapshots.get(str(owner))
+    if snapshot and time.monotonic() - snapshot["fetched_at"] < max_age:
+        return snapshot["accounts"]
+    return await load_token_snapshot(owner)
+
+def apply_token_account_update(owner, token_account, data):
+    """Fold the new raw data of one token account (None once closed) into the owner's snapshot."""
+    snapshot = token_snapshots.get(str(owner))
+    if snapshot is None:
+        return
+    accounts = snapshot["accounts"]
+    if not data or len(data) < ACCOUNT_LEN:
+        for mint in [mint for mint, entry in accounts.items() if entry["account"] == str(token_account)]:
+            del accounts[mint]
+            forget_token_account(owner, mint)
+        return
+    decoded = ACCOUNT_DECODER.parse(data, ["mint", "amount"])
+    mint = str(Pubkey.from_bytes(decoded.mint))
+    accounts[mint] = {"account": str(token_account), "amount": decoded.amount, "decimals": mint_decimals.get(mint)}
+    remember_token_account(owner, mint, Pubkey.from_string(str(token_account)))
+
+async def refresh_token_accounts(owner, mints):
+    """Re-read just the token accounts of `mints` (one getMultipleAccounts), e.g. right after a trade touched them."""
+    accounts = await get_token_snapshot(owner)
+    mints = [str(mint) for mint in mints]
+    token_accounts = [accounts[mint]["account"] if mint in accounts else str(get_associated_token_address(Pubkey.from_string(str(owner)), Pubkey.from_string(mint))) for mint in mints]
+    datas, _ = await asyncio.gather(get_multiple_accounts(token_accounts, commitment="processed"), get_mint_decimals(mints))
+    for token_account, data in zip(token_accounts, datas):
+        apply_token_account_update(owner, token_account, data)
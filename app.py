@@ -9,6 +9,7 @@ from config import *
 from constants import *
 from logs import *
 from utils import *
+from tasks import *
 from chart import *
 
 new_icon_path = "assets/icon.png"
@@ -19,6 +20,7 @@ setup_logging(log_file)
 logging.info(f"Initializing session")
 
 initialize_wallets_map(wallets_map)
+schedule_pool_index_refresh()
 
 async def text_animation_effect(title: str, widget: ft.Text):
     letters = string.ascii_uppercase
@@ -61,7 +63,7 @@ async def main(page: ft.Page):
     page.update()
 
 
-    def create_button(label, color, wrapper):
+    def create_button(label, color, on_click):
         return ft.ElevatedButton(
             content=ft.Row(
                 [ft.Text(value=label, color=color, size=14, weight="bold")],
@@ -87,7 +89,7 @@ async def main(page: ft.Page):
                     ft.MaterialState.DEFAULT: ft.RoundedRectangleBorder(radius=15),
                 },
             ),        
-            on_click=lambda e: asyncio.run(wrapper()),
+            on_click=lambda e: on_click(),
         )
         
     def create_text_field(label, hint_text, read_only=False):
@@ -137,21 +139,28 @@ async def main(page: ft.Page):
     def create_container(content, alignment=ft.alignment.top_left, padding=20, expand=True):
         return ft.Container(content=content, alignment=alignment, padding=ft.padding.all(padding), expand=expand)
 
-    async def token_input_box_wrapper():
-        logging.info(f"validating token")
-        spinner.visible = True
-        page.update()
-        pair_address = await validate_address(token_input_box, warning_text, token_balance_text, holdings_dropdown.value, swap_col)
-        await update_swap_tab(holdings_dropdown.value, swap_row.controls[1], page, spinner, token_input_box.value, pair_address)
-        spinner.visible = False
-        page.update()
+    def on_token_input(e):
+        address = token_input_box.value.strip()
+        warning = check_token_input(address, holdings_dropdown.value)
+        if warning is not None:
+            # nothing to look up: drop whatever lookup is still running for the previous input
+            get_scheduler().cancel("validate")
+            warning_text.value, warning_text.color = warning, "RED"
+            warning_text.update()
+            return
+        schedule(validate_token(address, holdings_dropdown.value, warning_text, token_balance_text, swap_col, swap_row.controls[1], page, spinner), name="Validate token", key="validate")
+
+    def submit_trade(label, operation):
+        # the order is read now: the task may wait for the wallet's earlier trades while the ui moves on
+        order = create_trade_order(holdings_dropdown.value, token_input_box.value, swap_col) if holdings_dropdown.value in wallets_map else None
+        schedule(handle_click_wrapper(operation, order), name=label, wallet=order["wallet"] if order else None)
 
-    async def handle_click_wrapper(operation):
-        if holdings_dropdown.value:
+    async def handle_click_wrapper(operation, order):
+        if order is not None:
             logging.info(f"Initiating {operation}")
             spinner.visible = True
             page.update()
-            await globals()[f"{operation}"](token_input_box.value, wallets_map[holdings_dropdown.value]["keypair"], swap_col, warning_text, token_balance_text, page)
+            await globals()[f"{operation}"](order, warning_text, token_balance_text, page)
             selected_wallet = holdings_dropdown.value
             if selected_wallet:
                 logging.info(f"Refreshing data")
@@ -171,7 +180,7 @@ async def main(page: ft.Page):
         label_style=ft.TextStyle(color="#9945FF", size=18),
         hint_text="Select Wallet",
         hint_style=ft.TextStyle(color="#14F195", size=12),
-        options=[ft.dropdown.Option(wallet_id) for wallet_id in wallets_map.keys()],
+        options=[ft.dropdown.Option(wallet_id) for wallet_id in wallets_map.keys()] + [ft.dropdown.Option(ALL_WALLETS)],
         width=200,
         height=40,
         text_size=12,
@@ -206,22 +215,29 @@ async def main(page: ft.Page):
                     ft.MaterialState.DEFAULT: ft.RoundedRectangleBorder(radius=15),
                 },
             ),        
-            on_click=lambda e: asyncio.run(refresh_holdings_page()),
+            on_click=lambda e: schedule(refresh_holdings_page(), name="Reload", key="holdings"),
         )
     warning_text = ft.Text(value="", color="#FF8F00", size=10, weight="bold")
+    task_queue_text = ft.Text(value="", color="#EEEEEE", size=10)
+
+    def show_task_queue(tasks):
+        task_queue_text.value = format_task_queue(tasks)
+        task_queue_text.update()
+
+    get_scheduler().listeners.append(show_task_queue)
 
-    selection_row = create_row([holdings_dropdown, refresh_button, spinner, warning_text], spacing=20)
+    selection_row = create_row([holdings_dropdown, refresh_button, spinner, warning_text, task_queue_text], spacing=20)
     data_table = create_empty_data_table(page)
     initial_chart_container = create_initial_chart_container(page)
-    holding_row = create_row([create_column([data_table]), create_column([initial_chart_container], alignment=ft.alignment.top_right)], alignment=ft.MainAxisAlignment.CENTER)
+    holding_row = create_row([create_column([create_holdings_controls(data_table, page), data_table]), create_column([initial_chart_container], alignment=ft.alignment.top_right)], alignment=ft.MainAxisAlignment.CENTER)
     
     token_input_box = create_text_field("Enter Token Address", "e.g., 3n5Qo2FW2oNx...")
-    token_input_box.on_change = lambda e: asyncio.run(token_input_box_wrapper())
+    token_input_box.on_change = on_token_input
 
-    buy_button = create_button("Buy", "#14F195", lambda: handle_click_wrapper('raydium_buy'))
-    sell_button = create_button("Sell", "#FFAF00", lambda: handle_click_wrapper('raydium_sell'))
-    burn_button = create_button("Burn", "#FF204E", lambda: handle_click_wrapper('burn_tokens'))
-    close_button = create_button("Close", "#F9E400", lambda: handle_click_wrapper('close_token_account'))
+    buy_button = create_button("Buy", "#14F195", lambda: submit_trade("Buy", 'raydium_buy'))
+    sell_button = create_button("Sell", "#FFAF00", lambda: submit_trade("Sell", 'raydium_sell'))
+    burn_button = create_button("Burn", "#FF204E", lambda: submit_trade("Burn", 'burn_tokens'))
+    close_button = create_button("Close", "#F9E400", lambda: submit_trade("Close", 'close_token_account'))
 
     swap_buttons_row = create_row([buy_button, sell_button, burn_button, close_button], alignment=ft.MainAxisAlignment.CENTER)
     token_balance_text = create_text_field("Token Balance", "", read_only=True)
@@ -246,13 +262,18 @@ async def main(page: ft.Page):
 
     global log_column
     log_column = ft.Column(expand=True, scroll=ft.ScrollMode.HIDDEN, alignment=ft.MainAxisAlignment.START, horizontal_alignment=ft.CrossAxisAlignment.START, spacing=-1)
-    threading.Thread(target=read_log_file, args=(log_column, log_file), daemon=True).start()
+    threading.Thread(target=flush_log_lines, args=(log_column,), daemon=True).start()
+    log_filter_row = create_log_filter(log_column)
 
     async def refresh_holdings_page():
         selected_wallet = holdings_dropdown.value
         if selected_wallet:
             logging.info(f"Refreshing data")
             await update_holdings_tab(selected_wallet, data_table, holding_row.controls[1], page, spinner)
+            if selected_wallet in wallets_map:
+                watch_holdings(selected_wallet, data_table, token_input_box, token_balance_text)
+            else:
+                unwatch_holdings()
         else:
             logging.warning(f"Please select a wallet first!")
             warning_text.value = "Please select a wallet first!"
@@ -261,7 +282,7 @@ async def main(page: ft.Page):
             warning_text.value = ""
             warning_text.update()
 
-    holdings_dropdown.on_change = lambda event: asyncio.run(refresh_holdings_page())
+    holdings_dropdown.on_change = lambda event: schedule(refresh_holdings_page(), name="Load wallet", key="holdings")
 
     selection_conatiner = ft.Container(
         content=selection_row,
@@ -288,6 +309,7 @@ async def main(page: ft.Page):
             controls=[
                 selection_conatiner,
                 tab_container,
+                log_filter_row,
                 log_conatiner
             ],
         )
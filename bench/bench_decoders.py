@@ -0,0 +1,54 @@
+"""construct vs decoders.FastLayout vs bulk_decode on random account buffers.
+
+    python bench/bench_decoders.py [accounts]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from layouts import *
+from decoders import *
+
+LAYOUTS = {
+    "LIQUIDITY_STATE_LAYOUT_V4": (LIQUIDITY_STATE_LAYOUT_V4, LIQUIDITY_STATE_DECODER_V4, ["coinDecimals", "pcDecimals", "swapFeeNumerator", "swapFeeDenominator"]),
+    "MARKET_STATE_LAYOUT_V3": (MARKET_STATE_LAYOUT_V3, MARKET_STATE_DECODER_V3, ["bids", "asks", "event_queue"]),
+    "OPEN_ORDERS_LAYOUT": (OPEN_ORDERS_LAYOUT, OPEN_ORDERS_DECODER, ["base_token_total", "quote_token_total"]),
+    "ACCOUNT_LAYOUT": (ACCOUNT_LAYOUT, ACCOUNT_DECODER, ["mint", "amount"]),
+}
+
+
+def random_buffer(layout):
+    data = bytearray(os.urandom(layout.sizeof()))
+    if any(getattr(subcon, "name", None) == "account_flags" for subcon in layout.subcons):
+        # serum account flags: only the 7 defined bits may be set
+        offset = 0
+        for subcon in layout.subcons:
+            if getattr(subcon, "name", None) == "account_flags":
+                data[offset:offset + 8] = (int.from_bytes(data[offset:offset + 8], "little") & 0x7F).to_bytes(8, "little")
+            offset += subcon.sizeof()
+    return bytes(data)
+
+def per_call(statement, number):
+    return min(timeit.repeat(statement, number=number, repeat=5)) / number * 1e6
+
+
+def main(accounts=1000):
+    print(f"{'layout':28} {'construct':>11} {'FastLayout':>11} {'fields':>9} {'bulk/acct':>10}  speedup")
+    for name, (layout, decoder, fields) in LAYOUTS.items():
+        blobs = [random_buffer(layout) for _ in range(accounts)]
+        # same output as construct, minus its _io entry
+        expected = {key: value for key, value in layout.parse(blobs[0]).items() if key != "_io"}
+        assert dict(decoder.parse(blobs[0])) == expected, name
+
+        data = blobs[0]
+        construct_us = per_call(lambda: layout.parse(data), 200)
+        fast_us = per_call(lambda: decoder.parse(data), 2000)
+        fields_us = per_call(lambda: decoder.parse(data, fields), 20000)
+        bulk_us = per_call(lambda: bulk_decode(blobs, layout, fields), 20) / accounts
+        print(f"{name:28} {construct_us:9.1f}us {fast_us:9.1f}us {fields_us:7.2f}us {bulk_us:8.3f}us  {construct_us / fast_us:.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
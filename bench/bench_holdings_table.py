@@ -0,0 +1,83 @@
+"""Holdings table build, refresh (2% of rows changed) and sort on fake 1k and 10k row portfolios.
+
+    python bench/bench_holdings_table.py [rows ...]
+
+`full table` syncs every row, `paged` goes through render_holdings and only materializes one page.
+"""
+import flet as ft
+import pandas as pd
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils
+from utils import sort_dataframe, sync_data_table, render_holdings
+
+
+def fake_holdings(rows, seed=0):
+    rng = random.Random(seed)
+    mints = [''.join(rng.choices("123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz", k=44)) for _ in range(rows)]
+    balance = [rng.uniform(0, 1e6) for _ in range(rows)]
+    price = [rng.uniform(0, 2) for _ in range(rows)]
+    return pd.DataFrame({
+        'Logo': [f"https://example.com/{mint}.png" if i % 3 else 'N/A' for i, mint in enumerate(mints)],
+        'Name': [f"Token {i}" for i in range(rows)],
+        'Symbol': [f"TK{i}" for i in range(rows)],
+        'Balance': balance,
+        'PriceUSD': price,
+        'BalanceUSD': [b * p for b, p in zip(balance, price)],
+        'FDV': [rng.randint(0, 10**9) for _ in range(rows)],
+        'Mint': mints,
+    })
+
+def changed(df, fraction=0.02, seed=1):
+    """A refreshed frame: same holdings, `fraction` of the balances moved."""
+    df = df.copy()
+    rows = random.Random(seed).sample(range(len(df)), max(1, int(len(df) * fraction)))
+    df.loc[rows, 'Balance'] *= 1.1
+    df.loc[rows, 'BalanceUSD'] *= 1.1
+    return df
+
+def timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def full_table(df):
+    utils.holdings_rows.clear()
+    table = ft.DataTable(columns=[])
+    build = timed(sync_data_table, table, df)
+    refresh = timed(sync_data_table, table, changed(df))
+    sort = timed(lambda: sync_data_table(table, sort_dataframe(df, 'BalanceUSD', False)))
+    return build, refresh, sort
+
+def paged(df):
+    utils.holdings_rows.clear()
+    table = ft.DataTable(columns=[])
+
+    def show(frame):
+        utils.df = frame
+        render_holdings(table)
+
+    build = timed(show, df)
+    refresh = timed(show, changed(df))
+    sort = timed(lambda: show(sort_dataframe(df, 'BalanceUSD', False)))
+    return build, refresh, sort
+
+
+def main(sizes=(1000, 10000)):
+    print(f"{'rows':>6} {'mode':11} {'first build':>12} {'refresh (2%)':>13} {'sort':>8}")
+    for rows in sizes:
+        df = fake_holdings(rows)
+        for mode, bench in [("full table", full_table), ("paged", paged)]:
+            build, refresh, sort = bench(df)
+            print(f"{rows:>6} {mode:11} {build:11.3f}s {refresh:12.3f}s {sort:7.3f}s")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or (1000, 10000))
@@ -0,0 +1,78 @@
+"""getSlot calls/sec against a local mock json-rpc server: an AsyncClient per call (the old way) vs the shared pooled
+httpx client vs batched rpc_call.
+
+    python bench/bench_rpc.py [calls] [concurrency]
+"""
+from aiohttp import web
+from solana.rpc.async_api import AsyncClient
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rpc import *
+from tasks import schedule
+
+
+async def handle(request):
+    payload = await request.json()
+    answer = lambda call: {"jsonrpc": "2.0", "id": call["id"], "result": 1}
+    return web.json_response([answer(call) for call in payload] if isinstance(payload, list) else answer(payload))
+
+def start_server():
+    """Serve the mock node from its own thread and loop, so it does not share the loop being measured."""
+    loop, started = asyncio.new_event_loop(), threading.Event()
+    urls = []
+
+    async def serve():
+        app = web.Application()
+        app.router.add_post("/", handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        urls.append(f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/")
+        started.set()
+
+    threading.Thread(target=lambda: (loop.run_until_complete(serve()), loop.run_forever()), daemon=True).start()
+    started.wait()
+    return urls[0]
+
+
+async def client_per_call(url):
+    async with AsyncClient(url) as client:
+        await client.get_slot()
+
+async def shared_client(url):
+    response = await get_client(url).post(url, json={"jsonrpc": "2.0", "id": 1, "method": "getSlot"})
+    response.raise_for_status()
+
+async def batched(url):
+    await rpc_call("getSlot", endpoint=url)
+
+async def run(call, url, calls, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await call(url)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(calls)])
+    return calls / (time.perf_counter() - start)
+
+
+def main(calls=1000, concurrency=50):
+    url = start_server()
+    print(f"{calls} getSlot calls, {concurrency} in flight")
+    for name, call in [("client per call", client_per_call), ("shared client", shared_client), ("batched rpc_call", batched)]:
+        schedule(run(call, url, 50, concurrency)).result()  # warm up connections
+        print(f"{name:18} {schedule(run(call, url, calls, concurrency)).result():8.0f} calls/s")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,81 @@
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire `ttl` seconds after they were set."""
+
+    def __init__(self, maxsize=256, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.time():
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return default
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        with self.lock:
+            self.entries[key] = (time.time() + (self.ttl if ttl is None else ttl), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self.lock:
+            return self.entries.pop(key, None) is not None
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"size": len(self.entries), "hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0}
+
+    def save(self, path):
+        # expiry times are wall clock, so entries stay valid across restarts
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        with self.lock:
+            now = time.time()
+            entries = [(key, entry) for key, entry in self.entries.items() if entry[0] >= now]
+        try:
+            with open(path, "wb") as file:
+                pickle.dump(entries, file)
+        except Exception as e:
+            logging.error(f"Failed to save cache to {path}: {e}")
+
+    def load(self, path):
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, "rb") as file:
+                entries = pickle.load(file)
+        except Exception as e:
+            logging.error(f"Failed to load cache from {path}: {e}")
+            return
+        with self.lock:
+            now = time.time()
+            for key, entry in entries[-self.maxsize:]:
+                if entry[0] >= now:
+                    self.entries[key] = entry
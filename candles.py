@@ -0,0 +1,136 @@
+from config import *
+from market import *
+
+import json
+import logging
+import numpy as np
+import pandas as pd
+import os
+import threading
+import time
+
+# one row per candle, appended to data/candles/<pool>_<token>_<timeframe>.candles
+CANDLE_DTYPE = np.dtype([("time", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"), ("volume", "<f8")])
+TIMEFRAME_SECONDS = {"minute": 60, "hour": 3600, "day": 86400}
+MAX_OHLCV_LIMIT = 1000
+
+_store_lock = threading.Lock()
+
+def candle_path(pool, token, timeframe):
+    return os.path.join(candle_store_path, f"{pool}_{token}_{timeframe}")
+
+def load_candles(pool, token, timeframe="minute"):
+    """Every stored candle of the pool, oldest first."""
+    path = candle_path(pool, token, timeframe) + ".candles"
+    if not os.path.exists(path):
+        return np.empty(0, dtype=CANDLE_DTYPE)
+    return np.fromfile(path, dtype=CANDLE_DTYPE)
+
+def load_candle_meta(pool, token, timeframe="minute"):
+    path = candle_path(pool, token, timeframe) + ".json"
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as file:
+            return json.load(file)
+    except Exception as e:
+        logging.error(f"Failed to read candle meta {path}: {e}")
+        return {}
+
+def save_candle_meta(pool, token, timeframe, meta):
+    with open(candle_path(pool, token, timeframe) + ".json", "w") as file:
+        json.dump(meta, file)
+
+def to_candles(ohlcv_list):
+    """GeckoTerminal's [[time, open, high, low, close, volume], ...] (newest first) as a sorted candle array."""
+    candles = np.array([tuple(row) for row in ohlcv_list], dtype=CANDLE_DTYPE)
+    _, first = np.unique(candles["time"], return_index=True)
+    return candles[first]
+
+def store_candles(pool, token, timeframe, candles):
+    """Merge fetched candles into the store: newer ones are appended in place (replacing the still open last candle), older ones rewrite the file."""
+    if not len(candles):
+        return
+    if not os.path.exists(candle_store_path):
+        os.makedirs(candle_store_path)
+    path = candle_path(pool, token, timeframe) + ".candles"
+    with _store_lock:
+        stored = load_candles(pool, token, timeframe)
+        if not len(stored) or candles["time"][0] >= stored["time"][0]:
+            keep = np.searchsorted(stored["time"], candles["time"][0])
+            with open(path, "ab") as file:
+                file.truncate(keep * CANDLE_DTYPE.itemsize)
+                file.write(candles.tobytes())
+        else:
+            newer = stored[np.searchsorted(stored["time"], candles["time"][-1], side="right"):]
+            np.concatenate([candles, newer]).tofile(path)
+
+async def update_candles(pool, token, timeframe="minute", window=ohlc_window):
+    """Bring the store up to date and make it reach `window` seconds back; only the missing candles are downloaded."""
+    step = TIMEFRAME_SECONDS[timeframe]
+    client = get_gecko_client()
+    now = int(time.time())
+    stored = load_candles(pool, token, timeframe)
+    meta = load_candle_meta(pool, token, timeframe)
+
+    # the last stored candle may still have been open, so it is fetched again
+    slots = (now - int(stored["time"][-1])) // step + 1 if len(stored) else window // step
+    limit = max(1, min(MAX_OHLCV_LIMIT, slots))
+    response = await client.get_ohlcv(pool, token, timeframe, limit=limit)
+    candles = to_candles(response["data"]["attributes"]["ohlcv_list"])
+    store_candles(pool, token, timeframe, candles)
+    meta["name"] = f"{response['meta']['base']['name']}/{response['meta']['quote']['name']}"
+    if not len(stored):
+        # a short answer means the pool has no older history
+        meta["covered_from"] = now - window if len(candles) < limit else int(candles["time"][0])
+
+    # backfill until the store reaches back far enough or the pool runs out of history
+    start = now - window
+    covered_from = meta.get("covered_from", int(stored["time"][0]) if len(stored) else now)
+    while covered_from > start:
+        limit = min(MAX_OHLCV_LIMIT, (covered_from - start) // step + 1)
+        response = await client.get_ohlcv(pool, token, timeframe, limit=limit, before_timestamp=covered_from)
+        older = to_candles(response["data"]["attributes"]["ohlcv_list"])
+        store_candles(pool, token, timeframe, older)
+        if len(older) < limit or older["time"][0] >= covered_from:
+            covered_from = start
+        else:
+            covered_from = int(older["time"][0])
+    meta["covered_from"] = min(covered_from, meta.get("covered_from", covered_from))
+    save_candle_meta(pool, token, timeframe, meta)
+    return meta["name"]
+
+def resample_candles(candles, seconds):
+    """Aggregate sorted candles into `seconds` wide buckets: first open, last close, high/low extremes and summed volume."""
+    if not len(candles):
+        return candles
+    buckets = candles["time"] // seconds * seconds
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(candles)] - 1
+    resampled = np.empty(len(starts), dtype=CANDLE_DTYPE)
+    resampled["time"] = buckets[starts]
+    resampled["open"] = candles["open"][starts]
+    resampled["high"] = np.maximum.reduceat(candles["high"], starts)
+    resampled["low"] = np.minimum.reduceat(candles["low"], starts)
+    resampled["close"] = candles["close"][ends]
+    resampled["volume"] = np.add.reduceat(candles["volume"], starts)
+    return resampled
+
+async def get_candles(pool, token, window=ohlc_window, resolution=60, timeframe="minute"):
+    """(candles of the last `window` seconds at `resolution` seconds per candle, chart name), updating the store first."""
+    chart_name = await update_candles(pool, token, timeframe, window)
+    candles = load_candles(pool, token, timeframe)
+    candles = candles[candles["time"] >= int(time.time()) - window]
+    if resolution > TIMEFRAME_SECONDS[timeframe]:
+        candles = resample_candles(candles, resolution)
+    return candles, chart_name
+
+def vwap(candles):
+    """Running volume weighted average of the typical price, from the first candle given."""
+    typical = (candles["high"] + candles["low"] + candles["close"]) / 3
+    volume = np.cumsum(candles["volume"])
+    return np.divide(np.cumsum(typical * candles["volume"]), volume, out=typical.copy(), where=volume > 0)
+
+def ema(values, span):
+    """Exponential moving average with alpha 2 / (span + 1), seeded with the first value."""
+    return pd.Series(values).ewm(span=span, adjust=False).mean().to_numpy()
@@ -7,6 +7,9 @@ import aiohttp
 import asyncio
 from datetime import datetime, timezone
 from millify import millify
+
+from config import *
+from candles import *
     
 BASE_COLORS = ["#BC7AF9", "#00AF91", "#FF0075", "#77D970", "#172774", "#FFE162", "#9945FF", "#00FFAB", "#2192FF"]
 
@@ -68,35 +71,70 @@ def holdings_chart(df: pd.DataFrame):
 
 
 # line chart
-async def get_ohlc(token, pool):
-    url = f"https://api.geckoterminal.com/api/v2/networks/solana/pools/{pool}/ohlcv/minute?aggregate=1&limit=120&currency=usd&token={token}"
-
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(url, headers={'Content-Type': 'application/json'}) as response:
-                response_json = await response.json()
-                data = response_json['data']['attributes']['ohlcv_list']
-                chart_name = f"{response_json['meta']['base']['name']}/{response_json['meta']['quote']['name']}"
-                
-                df = pd.DataFrame(data, columns=["Date", "open", "high", "low", "close", "volume"]).sort_values(by='Date', ascending=False)
-                df.set_index('Date', inplace=True)
-                df['close'] = df['close'].apply(lambda x: millify(x, precision=6, drop_nulls=False))
-                
-                return df, chart_name
-        except (aiohttp.ClientError, asyncio.TimeoutError, Exception) as e:
-            logging.error(f"Failed to get_ohlc: {str(e)}")
-            return pd.DataFrame(), None
-
-async def plot_tokenline_chart(df, chart_name, swap_col2, page):
+async def get_ohlc(token, pool, window=ohlc_window, resolution=ohlc_resolution):
+    """Candles of the pool as float64 columns (open, high, low, close, volume, vwap, ema) indexed by Date, oldest first."""
+    try:
+        candles, chart_name = await get_candles(pool, token, window, resolution)
+        df = pd.DataFrame({name: candles[name] for name in ("open", "high", "low", "close", "volume")}, index=pd.Index(candles["time"], name="Date"))
+        df['vwap'] = vwap(candles)
+        df['ema'] = ema(candles["close"], ema_span)
+        return df, chart_name
+    except (aiohttp.ClientError, asyncio.TimeoutError, Exception) as e:
+        logging.error(f"Failed to get_ohlc: {str(e)}")
+        return pd.DataFrame(), None
+
+def format_price(value):
+    return millify(value, precision=6, drop_nulls=False)
+
+def format_time(timestamp):
+    return datetime.fromtimestamp(int(timestamp), tz=timezone.utc).strftime('%H:%M')
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: indices of at most `threshold` points keeping the visual shape of the (x sorted) series."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = [0]
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        if end <= start:
+            continue
+        next_start, next_end = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected.append(a)
+    selected.append(n - 1)
+    return np.array(selected)
+
+def volume_bars(x, volume, count):
+    """Sum the volume into `count` equal-width groups of candles: (first x of each group, summed volume)."""
+    starts = np.unique(np.linspace(0, len(x), count, endpoint=False).astype(int))
+    return x[starts], np.add.reduceat(volume, starts)
+
+async def plot_tokenline_chart(df, chart_name, swap_col2, page, frames=chart_animation_frames):
+    """Draw close, EMA and VWAP lines plus volume bars in one page update, or progressively in `frames` updates.
+
+    `df` stays numeric; long series are cut down to the chart width with LTTB and values are only formatted for labels."""
     swap_col2.controls.clear()
-    if df is None:
+    if df is None or df.empty:
         logging.error(f"chart data is null")
         return
-    
-    formatted_xlabels = [ft.ChartAxisLabel(label=ft.Text(datetime.fromtimestamp(int(x), tz=timezone.utc).strftime('%H:%M')), value=float(x)) for x in df.index]
-    datapoints = [ft.LineChartDataPoint(x, y, tooltip=f"{y}\n{datetime.fromtimestamp(int(x), tz=timezone.utc).strftime('%H:%M')}",tooltip_style=ft.TextStyle(color="#EEEEEE")) for x, y in zip(df.index, df['close'])]
-    datapoints.sort(key=lambda p: p.x)
-    
+
+    df = df.sort_index()
+    x = df.index.to_numpy(dtype=np.float64)
+    close = df['close'].to_numpy(dtype=np.float64)
+    keep = lttb(x, close, min(chart_max_points, int(page.window.width)))
+    shown = df.iloc[keep]
+    shown_x = x[keep]
+
+    # a handful of evenly spaced time labels instead of one per candle
+    label_step = max(1, len(shown) // 6)
+    formatted_xlabels = [ft.ChartAxisLabel(label=ft.Text(format_time(t)), value=float(t)) for t in shown_x[::label_step]]
+    datapoints = [ft.LineChartDataPoint(t, y, tooltip=f"{format_price(y)}\n{format_time(t)}", tooltip_style=ft.TextStyle(color="#EEEEEE")) for t, y in zip(shown_x, shown['close'])]
+
     line_chart = ft.LineChartData(
         color=ft.colors.GREEN,
         stroke_width=2,
@@ -112,27 +150,48 @@ async def plot_tokenline_chart(df, chart_name, swap_col2, page):
         ),
         data_points=[]
     )
+    indicator_lines = [
+        ft.LineChartData(
+            color=color,
+            stroke_width=1,
+            curved=True,
+            data_points=[ft.LineChartDataPoint(t, y, show_tooltip=False) for t, y in zip(shown_x, shown[column])],
+        ) for column, color in (("ema", "#FFAF00"), ("vwap", "#9945FF")) if column in shown
+    ]
 
+    columns = ['close'] + [column for column in ('ema', 'vwap') if column in shown]
+    min_y, max_y = float(shown[columns].min().min()), float(shown[columns].max().max())
     chart = ft.LineChart(
-        data_series=[line_chart],
-        baseline_x=df.index.min(),
-        baseline_y=df['close'].min(),
+        data_series=[line_chart] + indicator_lines,
+        baseline_x=float(shown_x[0]),
+        baseline_y=min_y,
         tooltip_bgcolor=ft.colors.with_opacity(0.3, "#111418"),
-        min_y = df['close'].min(),
-        max_y = df['close'].max(),
-        min_x = df.index.min(),
-        max_x = df.index.max(),
+        min_y = min_y,
+        max_y = max_y,
+        min_x = float(shown_x[0]),
+        max_x = float(shown_x[-1]),
         expand=True,
-        left_axis=ft.ChartAxis(labels_size=100, show_labels=True, labels_interval=(float(df['close'].max()) - float(df['close'].min())) / 3),
+        left_axis=ft.ChartAxis(labels_size=100, show_labels=True, labels_interval=(max_y - min_y) / 3 or None),
         bottom_axis=ft.ChartAxis(labels=formatted_xlabels, show_labels=True, labels_size=100),
         interactive=True,
     )
-    
+
+    bar_x, bar_volume = volume_bars(x, df['volume'].to_numpy(dtype=np.float64), chart_volume_bars)
+    volume_chart = ft.BarChart(
+        bar_groups=[
+            ft.BarChartGroup(x=i, bar_rods=[ft.BarChartRod(from_y=0, to_y=float(v), width=4, color=ft.colors.with_opacity(0.6, "#14F195"), tooltip=f"$ {millify(v, precision=2)}\n{format_time(t)}", border_radius=0)])
+            for i, (t, v) in enumerate(zip(bar_x, bar_volume))
+        ],
+        max_y=float(bar_volume.max()) or 1,
+        interactive=True,
+        height=80,
+    )
+
     new_chart_container = ft.Container(
         ft.Column(
             [
                 ft.Text(
-                    value=f'{chart_name} on Raydium  1m',
+                    value=f'{chart_name} on Raydium  {ohlc_resolution // 60}m',
                     size=12,
                     weight="bold",
                     text_align=ft.TextAlign.LEFT,
@@ -143,7 +202,12 @@ async def plot_tokenline_chart(df, chart_name, swap_col2, page):
                     alignment=ft.alignment.bottom_center,
                     border_radius=10,
                     expand=True
-                )
+                ),
+                ft.Container(
+                    content=volume_chart,
+                    padding=ft.padding.only(left=110, right=10),
+                    alignment=ft.alignment.bottom_center,
+                ),
             ],
             spacing=10,
             tight=True,
@@ -156,8 +220,12 @@ async def plot_tokenline_chart(df, chart_name, swap_col2, page):
     )
     
     swap_col2.controls.append(new_chart_container)
-    for i in range(len(datapoints)):
-        line_chart.data_points.append(datapoints[i])
-        chart.data_series = [line_chart]
+    if frames and frames > 1:
+        # progressive reveal in a few decimated frames rather than one sync per point
+        for frame in range(1, frames + 1):
+            line_chart.data_points = datapoints[:len(datapoints) * frame // frames]
+            swap_col2.page.update()
+            await asyncio.sleep(chart_frame_delay)
+    else:
+        line_chart.data_points = datapoints
         swap_col2.page.update()
-        await asyncio.sleep(0.005)
@@ -1,7 +1,114 @@
-from solana.rpc.api import Client
-
 rpc = "yo_rpc_url_here"
-client = Client(rpc)
+ws_rpc = rpc.replace("https://", "wss://").replace("http://", "ws://")
+
+# pooled http session settings for the shared async rpc clients (see rpc.py)
+rpc_timeout = 30
+rpc_max_connections = 20
+rpc_max_keepalive_connections = 10
+rpc_keepalive_expiry = 30
+
+# calls issued within this window (seconds) are packed into one json-rpc batch post
+rpc_batch_window = 0.005
+rpc_max_batch_size = 100
+
+# rpc router (see rpc.py): reads go to the fastest healthy endpoint, are hedged on the next one once they run past
+# the endpoint's rpc_hedge_quantile latency, and fail over on errors; rpc_max_failures in a row rest an endpoint
+rpc_endpoints = [rpc]
+rpc_health_window = 100
+rpc_hedge_quantile = 0.95
+rpc_hedge_min_delay = 0.05
+rpc_hedge_max_delay = 1.0
+rpc_max_failures = 3
+rpc_failure_cooldown = 15
+
+# transaction confirmation (see txns.py); mode is "poll" or "subscribe"
+confirm_commitment = "confirmed"
+confirm_mode = "poll"
+confirm_timeout = 60
+confirm_poll_interval = 0.5
+
+# background blockhash refresher used by the transaction builders
+blockhash_commitment = "confirmed"
+blockhash_refresh_interval = 5
+blockhash_max_age = 20
+# re-signed sends after the first one, each only once the previous blockhash has expired unlanded
+max_resends = 3
+
+# local raydium v4 pool index (see pools.py)
+pool_index_path = "data/pool_index.sqlite3"
+# an incremental refresh further behind than this many pool creations falls back to a full scan
+pool_refresh_max_signatures = 5000
+# the app refreshes the index on startup and then every pool_refresh_interval seconds (0 only refreshes from the cli)
+pool_refresh_interval = 900
+
+# fetch_pool_keys results, kept across restarts
+pool_keys_cache_path = "data/pool_keys.pickle"
+pool_keys_cache_size = 512
+pool_keys_ttl = 7 * 24 * 3600
+
+# local amm quotes (see quote.py): reserves younger than pool_state_ttl seconds are quoted without rpc; reserves the
+# account feed keeps current (watch_pool) stay quotable for watched_pool_state_ttl, or until the feed drops
+pool_state_ttl = 2
+watched_pool_state_ttl = 600
+swap_slippage_bps = 500
+
+# (owner, mint) -> token account lookups (see accounts.py)
+token_account_ttl = 3600
+# owner-wide token account snapshots are fully reloaded once older than this (seconds)
+token_snapshot_ttl = 30
+
+# websocket account feed pushing live balances and pool reserves (see subscriptions.py)
+feed_commitment = "processed"
+feed_reconnect_delay = 2
+
+# "All Wallets" holdings view: how many wallets are fetched at once
+portfolio_concurrency = 8
+
+# ui task scheduler (see tasks.py): trades and lookups running at once per wallet
+scheduler_wallet_concurrency = 1
+# seconds allowed for closing the shared sessions when the app exits
+scheduler_shutdown_timeout = 5
+# token box lookups start once typing has paused this long (seconds)
+token_validation_debounce = 0.3
+
+# log panel: lines are pushed in frames every log_flush_interval seconds, log_max_lines stay on screen
+log_flush_interval = 0.1
+log_max_lines = 500
+log_buffer_size = 5000
+# log files (see logs.py): json lines, a new file every log_rotate_interval seconds or log_max_bytes, the newest
+# log_backup_count kept and indexed in log_index_path for the log panel filters (log_search_limit entries per page)
+log_max_bytes = 50 * 1024 * 1024
+log_rotate_interval = 24 * 3600
+log_backup_count = 40
+log_index_path = "logs/index.sqlite3"
+log_search_limit = 200
+# rpc batches are logged (method, latency_ms) at debug level: indexed, but hidden by the panel until its level filter goes below log_panel_level
+rpc_log_level = "DEBUG"
+log_panel_level = "INFO"
+
+# holdings table: rows per page, and the usd value below which tokens count as dust
+holdings_page_size = 50
+dust_threshold_usd = 0.01
+
+# geckoterminal market data (see market.py); the public api allows about 30 calls a minute
+gecko_api_url = "https://api.geckoterminal.com/api/v2"
+gecko_rate_limit = 0.5
+gecko_burst = 5
+gecko_max_retries = 4
+token_price_ttl = 60
+ohlcv_ttl = 30
+
+# local candle store (see candles.py): the swap chart shows ohlc_window seconds of ohlc_resolution second candles
+candle_store_path = "data/candles"
+ohlc_window = 2 * 3600
+ohlc_resolution = 60
+# swap chart rendering: at most chart_max_points points (lttb downsampled), drawn in one update or in chart_animation_frames steps
+chart_max_points = 600
+chart_animation_frames = 0
+chart_frame_delay = 0.03
+# indicators drawn with the swap chart
+ema_span = 20
+chart_volume_bars = 60
 
 wallets_map = {
     "Wallet 1": {
@@ -13,4 +120,4 @@ wallets_map = {
     "Wallet 3":{
         "private_key": "pk3_here"
     }
-}
\ No newline at end of file
+}
@@ -14,6 +14,8 @@ SOL = "So11111111111111111111111111111111111111112"
 WSOL = Pubkey.from_string("So11111111111111111111111111111111111111112")
 RAY_V4 = Pubkey.from_string("675kPX9MHTjS2zt1qfr1NYHuzeLXfQM9H24wFSUt1Mp8")
 RAY_AUTHORITY_V4 = Pubkey.from_string("5Q544fKrFoe6tsEbD7S8EmxGTJYAKtTVhAW5Q5pge4j1")
+# every raydium v4 initialize2 pays the pool creation fee to this account
+RAY_V4_CREATE_POOL_FEE = Pubkey.from_string("7YttLkHDoNj9wyDur5pM1ejNaAvT9X4eqaYcHQqtj2G5")
 OPEN_BOOK_PROGRAM = Pubkey.from_string("srmqPvymJeFKQ4zGQed1GFppgkRHL9kaELCbyksJtPX")
 
 MINT_LEN: int = 82
@@ -0,0 +1,123 @@
+from construct import Array, Bytes, BytesInteger, Container, FormatField, ListContainer
+
+from layouts import *
+
+import base64
+import numpy as np
+import struct
+
+ACCOUNT_FLAG_NAMES = ["initialized", "market", "open_orders", "request_queue", "event_queue", "bids", "asks"]
+
+def compile_reader(subcon, offset):
+    """Turn one construct field at a fixed offset into a function reading it straight off a memoryview."""
+    if isinstance(subcon, FormatField):
+        field = struct.Struct(subcon.fmtstr)
+        return lambda buffer: field.unpack_from(buffer, offset)[0]
+    if isinstance(subcon, BytesInteger):
+        end, byteorder, signed = offset + subcon.length, "little" if subcon.swapped else "big", subcon.signed
+        return lambda buffer: int.from_bytes(buffer[offset:end], byteorder, signed=signed)
+    if isinstance(subcon, Bytes):
+        end = offset + subcon.length
+        return lambda buffer: bytes(buffer[offset:end])
+    if isinstance(subcon, Array) and isinstance(subcon.subcon, FormatField):
+        fmt = subcon.subcon.fmtstr
+        field = struct.Struct(f"{fmt[0]}{subcon.count}{fmt[1:]}")
+        return lambda buffer: ListContainer(field.unpack_from(buffer, offset))
+    if isinstance(subcon, Array) and isinstance(subcon.subcon, Bytes):
+        count, length = subcon.count, subcon.subcon.length
+        return lambda buffer: ListContainer(bytes(buffer[offset + i * length:offset + (i + 1) * length]) for i in range(count))
+    end = offset + subcon.sizeof()
+    if subcon is ACCOUNT_FLAGS_LAYOUT:
+        def read_flags(buffer):
+            flags = int.from_bytes(buffer[offset:end], "little")
+            if flags >> len(ACCOUNT_FLAG_NAMES):
+                # let construct raise its ConstError for the reserved bits
+                return subcon.parse(bytes(buffer[offset:end]))
+            return Container((name, bool(flags >> i & 1)) for i, name in enumerate(ACCOUNT_FLAG_NAMES))
+        return read_flags
+    # anything else is rare enough to hand back to construct
+    return lambda buffer: subcon.parse(bytes(buffer[offset:end]))
+
+
+class FastLayout:
+    """struct/memoryview decoder mirroring a construct Struct; only the requested fields are read."""
+
+    def __init__(self, layout):
+        self.layout = layout
+        self.size = layout.sizeof()
+        self.offsets = {}
+        self.readers = {}
+        offset = 0
+        for subcon in layout.subcons:
+            if getattr(subcon, "name", None):
+                self.offsets[subcon.name] = offset
+                self.readers[subcon.name] = compile_reader(subcon.subcon, offset)
+            offset += subcon.sizeof()
+
+    def parse(self, data, fields=None):
+        """Same result as `layout.parse(data)` (minus construct's `_io`), restricted to `fields` if given."""
+        buffer = memoryview(data)
+        if len(buffer) < self.size:
+            raise ValueError(f"expected {self.size} bytes, got {len(buffer)}")
+        readers = self.readers
+        return Container((name, readers[name](buffer)) for name in (fields or readers))
+
+    def read(self, data, field):
+        return self.readers[field](memoryview(data))
+
+
+LIQUIDITY_STATE_DECODER_V4 = FastLayout(LIQUIDITY_STATE_LAYOUT_V4)
+MARKET_STATE_DECODER_V3 = FastLayout(MARKET_STATE_LAYOUT_V3)
+OPEN_ORDERS_DECODER = FastLayout(OPEN_ORDERS_LAYOUT)
+ACCOUNT_DECODER = FastLayout(ACCOUNT_LAYOUT)
+
+
+def numpy_format(fmtstr):
+    """NumPy code of a struct format like "<L": sized by struct itself, since numpy reads "L" as a (64-bit) C long."""
+    byteorder, code = fmtstr[0], fmtstr[1:]
+    kind = "f" if code in "efd" else "b" if code == "?" else "i" if code.islower() else "u"
+    return f"{byteorder}{kind}{struct.calcsize(fmtstr)}"
+
+def numpy_dtype(layout):
+    """NumPy structured dtype with the same field offsets as a construct Struct; padding is left out."""
+    names, formats, offsets = [], [], []
+    offset = 0
+    for subcon in layout.subcons:
+        size = subcon.sizeof()
+        if getattr(subcon, "name", None):
+            field = subcon.subcon
+            if isinstance(field, FormatField):
+                fmt = numpy_format(field.fmtstr)
+            elif isinstance(field, Array) and isinstance(field.subcon, FormatField):
+                fmt = (numpy_format(field.subcon.fmtstr), field.count)
+            elif field is ACCOUNT_FLAGS_LAYOUT:
+                fmt = "<u8"
+            else:
+                # pubkeys, u128 counters and byte arrays stay as raw bytes
+                fmt = f"V{size}"
+            names.append(subcon.name)
+            formats.append(fmt)
+            offsets.append(offset)
+        offset += size
+    return np.dtype({"names": names, "formats": formats, "offsets": offsets, "itemsize": offset})
+
+def bulk_decode(blobs, layout, fields=None):
+    """Decode N raw account blobs into one structured array in a single pass.
+
+    Returns (records, valid): row i always belongs to blob i; missing (None) or short blobs come back zeroed with
+    valid[i] False."""
+    dtype = numpy_dtype(layout)
+    size = dtype.itemsize
+    valid = np.array([blob is not None and len(blob) >= size for blob in blobs], dtype=bool)
+    empty = bytes(size)
+    buffer = b"".join(blob[:size] if ok else empty for blob, ok in zip(blobs, valid))
+    records = np.frombuffer(buffer, dtype=dtype)
+    return (records[fields] if fields else records), valid
+
+def account_blobs(accounts):
+    """Raw bytes of base64-encoded accounts as returned by getProgramAccounts/getMultipleAccounts, None for missing ones."""
+    blobs = []
+    for account in accounts:
+        account = account.get("account", account) if account else None
+        blobs.append(base64.b64decode(account["data"][0]) if account else None)
+    return blobs
@@ -1,23 +1,265 @@
 import flet as ft
 import time, datetime, os
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
+import sqlite3
+import threading
+from collections import deque
+
+from config import *
+from tasks import task_wallet
 
 LOG_FOLDER = "logs"
+# structured fields a record may carry (logging.info(..., extra={"signature": sig})); wallet defaults to the running task's
+LOG_FIELDS = ("wallet", "mint", "signature", "method", "latency_ms")
+LOG_LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
+
+_index_lock = threading.Lock()
+_index_reader = None
+
+
+def log_entry(record):
+    """The json object written for `record`: time, level, message and whichever LOG_FIELDS it carries."""
+    entry = {"time": round(record.created, 6), "level": record.levelname, "message": record.getMessage()}
+    for field in LOG_FIELDS:
+        value = getattr(record, field, None)
+        if value is not None:
+            entry[field] = value if isinstance(value, (int, float)) else str(value)
+    return entry
+
+
+class WalletFilter(logging.Filter):
+    """Tags records logged from a scheduler task with that task's wallet; runs in the logging thread, where the context is."""
+
+    def filter(self, record):
+        if getattr(record, "wallet", None) is None:
+            record.wallet = task_wallet.get()
+        return True
+
+
+class LogStore(logging.Handler):
+    """Json lines log files with an sqlite index of where every entry sits, so history is searched without reading whole files.
+
+    A new file is started every `rotate_interval` seconds or once one passes `max_bytes`; only the newest `backup_count` are kept.
+    Lines are flushed and index rows committed whenever the log queue runs empty, i.e. once per burst."""
+
+    def __init__(self, log_file, index_path=log_index_path, max_bytes=log_max_bytes, rotate_interval=log_rotate_interval, backup_count=log_backup_count):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.backup_count = backup_count
+        self.log_queue = None
+        self.index = open_log_index(index_path)
+        self.stream = None
+        self.open_file(log_file)
+
+    def open_file(self, path):
+        if self.stream:
+            self.stream.close()
+        self.path = path
+        self.stream = open(path, "ab")
+        self.opened_at = time.time()
+        with self.index:
+            self.file_id = self.index.execute("INSERT INTO files (path, created_at) VALUES (?, ?)", (path, self.opened_at)).lastrowid
+        self.remove_old_files()
+
+    def remove_old_files(self):
+        old = self.index.execute("SELECT id, path FROM files ORDER BY id DESC LIMIT -1 OFFSET ?", (self.backup_count,)).fetchall()
+        for file_id, path in old:
+            with self.index:
+                self.index.execute("DELETE FROM entries WHERE file_id = ?", (file_id,))
+                self.index.execute("DELETE FROM files WHERE id = ?", (file_id,))
+            if os.path.exists(path):
+                os.remove(path)
+
+    def should_rotate(self, record):
+        return self.stream.tell() >= self.max_bytes or record.created >= self.opened_at + self.rotate_interval
+
+    def emit(self, record):
+        try:
+            if self.should_rotate(record):
+                self.flush()
+                self.open_file(create_log_file())
+            entry = log_entry(record)
+            line = json.dumps(entry).encode() + b"\n"
+            offset = self.stream.tell()
+            self.stream.write(line)
+            record.log_id = self.index.execute(
+                "INSERT INTO entries (time, levelno, wallet, mint, signature, method, file_id, offset, length) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (entry["time"], record.levelno, entry.get("wallet"), entry.get("mint"), entry.get("signature"), entry.get("method"), self.file_id, offset, len(line)),
+            ).lastrowid
+            if self.log_queue is None or self.log_queue.empty():
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        # lines first, so a committed index row always points at data on disk
+        if self.stream:
+            self.stream.flush()
+            self.index.commit()
+
+    def close(self):
+        self.flush()
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        self.index.close()
+        super().close()
+
+
+class LogBuffer(logging.Handler):
+    """Ring buffer of entries waiting for the log panel; when the panel falls behind the oldest entries are dropped."""
+
+    def __init__(self, maxlen=log_buffer_size):
+        super().__init__()
+        self.entries = deque(maxlen=maxlen)
+        self.ready = threading.Event()
+
+    def emit(self, record):
+        try:
+            entry = log_entry(record)
+            # set by LogStore, which handles the record first
+            entry["id"] = getattr(record, "log_id", None)
+            self.entries.append(entry)
+            self.ready.set()
+        except Exception:
+            self.handleError(record)
+
+    def drain(self):
+        # clear first, so an entry emitted while draining wakes the next frame
+        self.ready.clear()
+        entries = []
+        while self.entries:
+            entries.append(self.entries.popleft())
+        return entries
+
+
+log_buffer = LogBuffer()
+_log_listener = None
+# what the log panel shows: entries of at least "level" whose wallet, mint or signature is "term"
+log_filter = {"level": log_panel_level, "term": None}
+_log_column_lock = threading.Lock()
 
 def create_log_file():
     if not os.path.exists(LOG_FOLDER):
         os.makedirs(LOG_FOLDER)
     timestamp = datetime.datetime.now().strftime("%d-%b-%y_%H:%M:%S")
-    return os.path.join(LOG_FOLDER, f"logs_{timestamp}.log")
+    path = os.path.join(LOG_FOLDER, f"logs_{timestamp}.jsonl")
+    # a size rotation can come within the same second
+    count = 1
+    while os.path.exists(path):
+        count += 1
+        path = os.path.join(LOG_FOLDER, f"logs_{timestamp}_{count}.jsonl")
+    return path
+
+def open_log_index(path=log_index_path):
+    folder = os.path.dirname(path)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+    index = sqlite3.connect(path, check_same_thread=False)
+    # wal lets the log panel search while the listener thread writes
+    index.execute("PRAGMA journal_mode=WAL")
+    index.executescript("""
+        CREATE TABLE IF NOT EXISTS files (
+            id INTEGER PRIMARY KEY,
+            path TEXT NOT NULL,
+            created_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS entries (
+            id INTEGER PRIMARY KEY,
+            time REAL NOT NULL,
+            levelno INTEGER NOT NULL,
+            wallet TEXT,
+            mint TEXT,
+            signature TEXT,
+            method TEXT,
+            file_id INTEGER NOT NULL,
+            offset INTEGER NOT NULL,
+            length INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS entries_by_level ON entries (levelno);
+        CREATE INDEX IF NOT EXISTS entries_by_wallet ON entries (wallet);
+        CREATE INDEX IF NOT EXISTS entries_by_mint ON entries (mint);
+        CREATE INDEX IF NOT EXISTS entries_by_signature ON entries (signature);
+        CREATE INDEX IF NOT EXISTS entries_by_file ON entries (file_id);
+    """)
+    return index
 
 def setup_logging(log_file):
-    """Set up logging to write to the new log file."""
-    logging.basicConfig(
-        filename=log_file,
-        level=logging.INFO,
-        format='%(asctime)s.%(msecs)06d [%(levelname)s] %(message)s',
-        datefmt='%d-%b-%y %H:%M:%S'
-    )
+    """Log through a queue: callers only enqueue, a listener thread writes the indexed log files and fills the log panel buffer."""
+    global _log_listener
+    log_queue = queue.SimpleQueue()
+    store = LogStore(log_file)
+    store.log_queue = log_queue
+
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(WalletFilter())
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    logging.getLogger("rpc").setLevel(rpc_log_level)
+    root.addHandler(queue_handler)
+    _log_listener = logging.handlers.QueueListener(log_queue, store, log_buffer)
+    _log_listener.start()
+    atexit.register(stop_logging)
+
+def stop_logging():
+    global _log_listener
+    if _log_listener:
+        _log_listener.stop()
+        for handler in _log_listener.handlers:
+            handler.close()
+        _log_listener = None
+
+def search_logs(level=None, term=None, before_id=None, limit=log_search_limit, index_path=log_index_path):
+    """Newest first entries of at least `level` whose wallet, mint or signature equals `term`, read from the indexed files.
+
+    Page back with `before_id`, the "id" of the oldest entry returned so far."""
+    global _index_reader
+    conditions, params = [], []
+    if level:
+        conditions.append("levelno >= ?")
+        params.append(logging.getLevelName(level))
+    if term:
+        conditions.append("(wallet = ? OR mint = ? OR signature = ?)")
+        params += [term] * 3
+    if before_id:
+        conditions.append("entries.id < ?")
+        params.append(before_id)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    with _index_lock:
+        if _index_reader is None:
+            _index_reader = open_log_index(index_path)
+        rows = _index_reader.execute(
+            f"SELECT entries.id, path, offset, length FROM entries JOIN files ON files.id = file_id {where} ORDER BY entries.id DESC LIMIT ?",
+            params + [limit],
+        ).fetchall()
+
+    entries, files = [], {}
+    try:
+        for entry_id, path, offset, length in rows:
+            if path not in files:
+                files[path] = open(path, "rb")
+            files[path].seek(offset)
+            entry = json.loads(files[path].read(length))
+            entry["id"] = entry_id
+            entries.append(entry)
+    except Exception as e:
+        # a file removed by rotation between the query and the read
+        logging.warning(f"Log search stopped early: {e}")
+    finally:
+        for file in files.values():
+            file.close()
+    return entries
+
+def matches_log_filter(entry, level=None, term=None):
+    """search_logs' filter applied to a live entry."""
+    if level and logging.getLevelName(entry["level"]) < logging.getLevelName(level):
+        return False
+    return not term or term in (entry.get("wallet"), entry.get("mint"), entry.get("signature"))
 
 def get_log_color(level):
     colors = {
@@ -30,59 +272,105 @@ def get_log_color(level):
     return colors.get(level, ft.colors.WHITE)
 
 
-def read_log_file(log_column, log_file):
-    with open(log_file, "r") as file:
-        while True:
-            line = file.readline()
-            if line:
-                append_log_line(log_column, line)
-            else:
-                time.sleep(1)
-
-
-def append_log_line(log_column, line):
-    level = next((key for key in ["INFO", "WARNING", "ERROR", "CRITICAL", "DEBUG"] if f"[{key}]" in line), "UNKNOWN")
-    log_color = get_log_color(level)
-
-    if level != "UNKNOWN":
-        pre_level, post_level = line.split(f"[{level}]")        
-        if "https://" in post_level:
-            pre_url, url = post_level.split("https://", 1)
-            url = f"https://{url.strip()}"
-            text_spans = [
-                ft.TextSpan(pre_level, style=ft.TextStyle(color="#EEEEEE")),
-                ft.TextSpan(f"{level}", style=ft.TextStyle(color=log_color)),
-                ft.TextSpan(pre_url, style=ft.TextStyle(color="#EEEEEE")),
-                ft.TextSpan(
-                    url,
-                    style=ft.TextStyle(
-                        color="#3EDBF0",
-                        decoration=ft.TextDecoration.UNDERLINE,
-                    ),
-                    url=url,
-                    on_enter=lambda e: highlight_link(e),
-                    on_exit=lambda e: unhighlight_link(e),
+def flush_log_lines(log_column, interval=log_flush_interval, max_lines=log_max_lines):
+    """Move buffered entries into the log panel in frames: at most one update (and scroll) every `interval` seconds, `max_lines` kept on screen.
+
+    While a filter is set only matching entries are added."""
+    while True:
+        log_buffer.ready.wait()
+        time.sleep(interval)
+        entries = [entry for entry in log_buffer.drain() if matches_log_filter(entry, **log_filter)][-max_lines:]
+        if not entries:
+            continue
+        with _log_column_lock:
+            log_column.controls.extend(create_log_line(entry) for entry in entries)
+            del log_column.controls[:-max_lines]
+        try:
+            log_column.update()
+            log_column.scroll_to(offset=-1, duration=300)
+        except Exception:
+            # not on the page yet, the next frame sends them along
+            pass
+
+def show_log_history(log_column, older=False, max_lines=log_max_lines):
+    """Fill the log panel from the index for the current filter; `older` prepends the page before the oldest entry shown."""
+    with _log_column_lock:
+        before_id = next((line.data for line in log_column.controls if line.data), None) if older else None
+        if older and before_id is None:
+            return
+        entries = search_logs(before_id=before_id, **log_filter)
+        lines = [create_log_line(entry) for entry in reversed(entries)]
+        log_column.controls = (lines + log_column.controls)[:max_lines] if older else lines
+    log_column.update()
+    if not older:
+        log_column.scroll_to(offset=-1, duration=300)
+
+def create_log_filter(log_column):
+    """Level and wallet / mint / signature filters for the log panel, plus a pager into older history."""
+
+    def on_level(e):
+        log_filter["level"] = e.control.value
+        show_log_history(log_column)
+
+    def on_term(e):
+        log_filter["term"] = (e.control.value or "").strip() or None
+        show_log_history(log_column)
+
+    return ft.Row([
+        ft.Dropdown(
+            value=log_filter["level"], options=[ft.dropdown.Option(level) for level in LOG_LEVELS],
+            width=120, height=40, text_size=12, content_padding=10, color="#EEEEEE", border_color="#EEEEEE", on_change=on_level,
+        ),
+        ft.TextField(
+            hint_text="Wallet, mint or signature", hint_style=ft.TextStyle(color="#EEEEEE", size=11), width=400, height=40, text_size=12,
+            content_padding=10, bgcolor="black", border_color="#EEEEEE", border_width=1, border_radius=ft.border_radius.all(10), color="#EEEEEE",
+            on_submit=on_term,
+        ),
+        ft.TextButton("Older", on_click=lambda e: show_log_history(log_column, older=True)),
+    ], spacing=10)
+
+
+def create_log_line(entry):
+    level = entry["level"]
+    timestamp = datetime.datetime.fromtimestamp(entry["time"]).strftime("%d-%b-%y %H:%M:%S.%f")[:-3]
+    text_spans = [
+        ft.TextSpan(f"{timestamp} ", style=ft.TextStyle(color="#EEEEEE")),
+        ft.TextSpan(level, style=ft.TextStyle(color=get_log_color(level))),
+    ]
+    if entry.get("wallet"):
+        text_spans.append(ft.TextSpan(f" [{entry['wallet']}]", style=ft.TextStyle(color="#9945FF")))
+
+    message, signature = f" {entry['message']}", entry.get("signature")
+    if signature and signature not in message:
+        message = f"{message} {signature}"
+    if signature:
+        pre_signature, post_signature = message.split(signature, 1)
+        url = f"https://solscan.io/tx/{signature}"
+        text_spans += [
+            ft.TextSpan(pre_signature, style=ft.TextStyle(color="#EEEEEE")),
+            ft.TextSpan(
+                signature,
+                style=ft.TextStyle(
+                    color="#3EDBF0",
+                    decoration=ft.TextDecoration.UNDERLINE,
                 ),
-            ]
-        else:
-            text_spans = [
-                ft.TextSpan(pre_level, style=ft.TextStyle(color="#EEEEEE")),
-                ft.TextSpan(f"{level}", style=ft.TextStyle(color=log_color)),
-                ft.TextSpan(post_level, style=ft.TextStyle(color="#EEEEEE")),
-            ]
+                url=url,
+                on_enter=lambda e: highlight_link(e),
+                on_exit=lambda e: unhighlight_link(e),
+            ),
+            ft.TextSpan(post_signature, style=ft.TextStyle(color="#EEEEEE")),
+        ]
     else:
-        text_spans = [ft.TextSpan(line, style=ft.TextStyle(color="#EEEEEE"))]
-
-    log_column.controls.append(
-        ft.Text(
-            spans=text_spans,
-            size=12,
-            text_align=ft.TextAlign.START,
-            selectable=True,
-        )
+        text_spans.append(ft.TextSpan(message, style=ft.TextStyle(color="#EEEEEE")))
+
+    return ft.Text(
+        spans=text_spans,
+        size=12,
+        text_align=ft.TextAlign.START,
+        selectable=True,
+        # index id, used to page back from the oldest line on screen
+        data=entry.get("id"),
     )
-    log_column.update()
-    log_column.scroll_to(offset=-1, duration=300)
 
 def highlight_link(e):
     e.control.style.color = "#0079FF"
@@ -0,0 +1,117 @@
+from config import *
+from tasks import on_shutdown
+from cache import TTLCache
+
+import aiohttp
+import asyncio
+import logging
+import time
+
+MAX_TOKENS_PER_REQUEST = 30
+
+_client = None
+
+# mint -> token attributes ({} for mints GeckoTerminal doesn't know, so those are not asked for again either)
+token_cache = TTLCache(4096, token_price_ttl)
+ohlcv_cache = TTLCache(64, ohlcv_ttl)
+
+
+class TokenBucket:
+    """Token bucket shared by every GeckoTerminal call, so the rate limit holds across UI tasks."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def reserve(self):
+        """Take one token and return how long to wait before it may be spent."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        self.tokens -= 1
+        return 0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    async def acquire(self):
+        wait = self.reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+
+gecko_bucket = TokenBucket(gecko_rate_limit, gecko_burst)
+
+
+class GeckoClient:
+    """GeckoTerminal api over one pooled aiohttp session, rate limited and retrying 429/5xx with backoff."""
+
+    def __init__(self, base_url=gecko_api_url, bucket=gecko_bucket, max_retries=gecko_max_retries):
+        self.base_url = base_url
+        self.bucket = bucket
+        self.max_retries = max_retries
+        self.session = None
+
+    def get_session(self):
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(headers={"Accept": "application/json"}, timeout=aiohttp.ClientTimeout(total=rpc_timeout))
+        return self.session
+
+    async def get_json(self, path, params=None):
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire()
+            async with self.get_session().get(f"{self.base_url}{path}", params=params) as response:
+                if (response.status != 429 and response.status < 500) or attempt == self.max_retries:
+                    response.raise_for_status()
+                    return await response.json()
+                retry_after = response.headers.get("Retry-After")
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else 2 ** attempt
+            logging.warning(f"GeckoTerminal answered {response.status}, retrying in {delay}s")
+            await asyncio.sleep(delay)
+
+    async def get_tokens(self, mints):
+        """Attributes of every mint ({} if unknown), from cache while fresh; the missing ones are fetched 30 per request, concurrently."""
+        mints = list(dict.fromkeys(str(mint) for mint in mints))
+        tokens = {mint: token_cache.get(mint) for mint in mints}
+        missing = [mint for mint, attrs in tokens.items() if attrs is None]
+        chunks = [missing[i:i + MAX_TOKENS_PER_REQUEST] for i in range(0, len(missing), MAX_TOKENS_PER_REQUEST)]
+        responses = await asyncio.gather(*[self.get_json(f"/networks/solana/tokens/multi/{','.join(chunk)}") for chunk in chunks], return_exceptions=True)
+        for chunk, response in zip(chunks, responses):
+            if isinstance(response, Exception):
+                logging.error(f"Failed to fetch token data for chunk: {response}")
+                continue
+            found = {token['attributes']['address']: token['attributes'] for token in response.get('data', [])}
+            for mint in chunk:
+                tokens[mint] = found.get(mint, {})
+                token_cache.set(mint, tokens[mint])
+        return {mint: attrs for mint, attrs in tokens.items() if attrs is not None}
+
+    async def get_ohlcv(self, pool, token, timeframe="minute", aggregate=1, limit=120, before_timestamp=None):
+        key = (str(pool), str(token), timeframe, aggregate, limit, before_timestamp)
+        response = ohlcv_cache.get(key)
+        if response is None:
+            params = {"aggregate": aggregate, "limit": limit, "currency": "usd", "token": str(token)}
+            if before_timestamp:
+                params["before_timestamp"] = before_timestamp
+            response = await self.get_json(f"/networks/solana/pools/{pool}/ohlcv/{timeframe}", params)
+            ohlcv_cache.set(key, response)
+        return response
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+
+def get_gecko_client():
+    # its aiohttp session is bound to the scheduler loop, where every caller runs
+    global _client
+    if _client is None:
+        _client = GeckoClient()
+    return _client
+
+@on_shutdown
+async def close_gecko_client():
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.close()
@@ -0,0 +1,202 @@
+from config import *
+from constants import *
+from rpc import *
+from cache import TTLCache
+from tasks import get_scheduler, schedule
+
+import asyncio
+import base58
+import base64
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+# raydium v4 amm account layout: 752 bytes, coinMintAddress at 400, pcMintAddress at 432
+POOL_DATA_LENGTH, BASE_MINT_OFFSET, QUOTE_MINT_OFFSET = 752, 400, 432
+# initialize2 instruction tag, and where its account list has the amm id and the two mints
+INITIALIZE2_TAG, INITIALIZE2_AMM_INDEX, INITIALIZE2_BASE_MINT_INDEX, INITIALIZE2_QUOTE_MINT_INDEX = 1, 4, 8, 9
+MAX_SIGNATURES_PER_CALL = 1000
+
+_pool_index = None
+_pool_index_lock = threading.Lock()
+
+pool_keys_cache = TTLCache(pool_keys_cache_size, pool_keys_ttl)
+pool_keys_cache.load(pool_keys_cache_path)
+
+def get_pool_index(path=pool_index_path):
+    """Open (and create on first use) the on-disk mint pair -> amm id index."""
+    global _pool_index
+    if _pool_index is None:
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        _pool_index = sqlite3.connect(path, check_same_thread=False)
+        _pool_index.executescript("""
+            CREATE TABLE IF NOT EXISTS pools (
+                amm_id TEXT PRIMARY KEY,
+                base_mint TEXT NOT NULL,
+                quote_mint TEXT NOT NULL,
+                updated_at INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS pools_by_pair ON pools (base_mint, quote_mint);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        """)
+    return _pool_index
+
+def lookup_pair_address(token_mint, quote_mint=SOL):
+    """Return the indexed amm id for the pair, preferring pools with `token_mint` as the base."""
+    with _pool_index_lock:
+        row = get_pool_index().execute(
+            "SELECT amm_id FROM pools WHERE (base_mint = ? AND quote_mint = ?) OR (base_mint = ? AND quote_mint = ?) "
+            "ORDER BY base_mint = ? DESC LIMIT 1",
+            (token_mint, quote_mint, quote_mint, token_mint, token_mint),
+        ).fetchone()
+    return row[0] if row else None
+
+def add_pools(pools):
+    """Upsert (amm_id, base_mint, quote_mint) rows; returns how many were written."""
+    now = int(time.time())
+    rows = [(str(amm_id), str(base_mint), str(quote_mint), now) for amm_id, base_mint, quote_mint in pools]
+    with _pool_index_lock:
+        index = get_pool_index()
+        with index:
+            index.executemany("INSERT OR REPLACE INTO pools VALUES (?, ?, ?, ?)", rows)
+    return len(rows)
+
+def import_pool_snapshot(path):
+    """Bulk load a pool snapshot: raydium's liquidity json ({"official": [...], "unOfficial": [...]}) or a plain list of pools."""
+    logging.info(f"Importing pool snapshot {path}")
+    with open(path, "r") as file:
+        snapshot = json.load(file)
+    entries = snapshot if isinstance(snapshot, list) else snapshot.get("official", []) + snapshot.get("unOfficial", [])
+    count = add_pools(
+        (entry["id"], entry["baseMint"], entry["quoteMint"])
+        for entry in entries
+        if entry.get("programId", str(RAY_V4)) == str(RAY_V4)
+    )
+    logging.info(f"Imported {count} pools")
+    return count
+
+async def scan_pools(base_mint=None, quote_mint=None):
+    """getProgramAccounts over raydium v4 filtered by mint, fetching only the 64 mint bytes of each pool."""
+    filters = [{"dataSize": POOL_DATA_LENGTH}]
+    if base_mint:
+        filters.append({"memcmp": {"offset": BASE_MINT_OFFSET, "bytes": str(base_mint)}})
+    if quote_mint:
+        filters.append({"memcmp": {"offset": QUOTE_MINT_OFFSET, "bytes": str(quote_mint)}})
+    opts = {"encoding": "base64", "commitment": "confirmed", "filters": filters, "dataSlice": {"offset": BASE_MINT_OFFSET, "length": 64}}
+    accounts = await rpc_call("getProgramAccounts", [str(RAY_V4), opts])
+    pools = []
+    for account in accounts:
+        data = base64.b64decode(account["account"]["data"][0])
+        pools.append((account["pubkey"], Pubkey.from_bytes(data[:32]), Pubkey.from_bytes(data[32:64])))
+    return pools
+
+async def get_pool_creation_signatures(until=None, limit=MAX_SIGNATURES_PER_CALL, before=None):
+    opts = {"limit": limit, "commitment": "confirmed"}
+    if until:
+        opts["until"] = until
+    if before:
+        opts["before"] = before
+    return await rpc_call("getSignaturesForAddress", [str(RAY_V4_CREATE_POOL_FEE), opts])
+
+async def get_pool_creations(until, max_signatures=pool_refresh_max_signatures):
+    """(signatures of the successful pool creations since `until`, newest signature seen), or None when more than `max_signatures` happened."""
+    signatures, newest, before = [], until, None
+    while True:
+        page = await get_pool_creation_signatures(until, before=before)
+        if page and before is None:
+            newest = page[0]["signature"]
+        signatures += [entry["signature"] for entry in page if entry["err"] is None]
+        if len(page) < MAX_SIGNATURES_PER_CALL:
+            return signatures, newest
+        if len(signatures) > max_signatures:
+            return None
+        before = page[-1]["signature"]
+
+def created_pools(transaction):
+    """(amm id, base mint, quote mint) of every raydium v4 initialize2 in a json encoded transaction, cpi calls included."""
+    message, meta = transaction["transaction"]["message"], transaction.get("meta") or {}
+    loaded = meta.get("loadedAddresses") or {}
+    keys = message["accountKeys"] + loaded.get("writable", []) + loaded.get("readonly", [])
+    instructions = message["instructions"] + [ix for inner in meta.get("innerInstructions") or [] for ix in inner["instructions"]]
+    pools = []
+    for instruction in instructions:
+        if keys[instruction["programIdIndex"]] != str(RAY_V4) or base58.b58decode(instruction["data"])[:1] != bytes([INITIALIZE2_TAG]):
+            continue
+        accounts = instruction["accounts"]
+        pools.append(tuple(keys[accounts[index]] for index in (INITIALIZE2_AMM_INDEX, INITIALIZE2_BASE_MINT_INDEX, INITIALIZE2_QUOTE_MINT_INDEX)))
+    return pools
+
+async def get_created_pools(signatures):
+    opts = {"encoding": "json", "maxSupportedTransactionVersion": 0, "commitment": "confirmed"}
+    transactions = await asyncio.gather(*[rpc_call("getTransaction", [signature, opts]) for signature in signatures])
+    return [pool for transaction in transactions if transaction for pool in created_pools(transaction)]
+
+def get_pool_index_meta(key):
+    with _pool_index_lock:
+        row = get_pool_index().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+def set_pool_index_meta(key, value):
+    with _pool_index_lock:
+        index = get_pool_index()
+        with index:
+            index.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+
+async def refresh_pool_index(quote_mint=SOL):
+    """Bring the index up to date from the pool creations since the last refresh.
+
+    The last creation seen is kept as a watermark: a refresh reads only the creation transactions after it (pools of any
+    quote mint). Without one, or when too far behind, it falls back to scanning every pool quoted against `quote_mint`."""
+    logging.info(f"Refreshing pool index")
+    watermark = get_pool_index_meta("last_signature")
+    creations = await get_pool_creations(watermark) if watermark else None
+    if creations is not None:
+        signatures, new_watermark = creations
+        count = add_pools(await get_created_pools(signatures))
+    else:
+        # read the watermark before scanning, so pools created during the scan come with the next refresh
+        latest = await get_pool_creation_signatures(limit=1)
+        with _pool_index_lock:
+            known = {row[0] for row in get_pool_index().execute("SELECT amm_id FROM pools")}
+        as_quote, as_base = await asyncio.gather(scan_pools(quote_mint=quote_mint), scan_pools(base_mint=quote_mint))
+        count = add_pools(pool for pool in as_quote + as_base if pool[0] not in known)
+        new_watermark = latest[0]["signature"] if latest else None
+    if new_watermark:
+        set_pool_index_meta("last_signature", new_watermark)
+    logging.info(f"Added {count} new pools to the index")
+    return count
+
+def schedule_pool_index_refresh(interval=pool_refresh_interval):
+    """Refresh the pool index through the scheduler now, and again `interval` seconds after each refresh ends."""
+    if not interval:
+        return
+    future = schedule(refresh_pool_index(), name="Refresh pool index", key="pool-index")
+    # done callbacks run on the scheduler loop; a failed refresh was logged there and is simply retried next time
+    future.add_done_callback(lambda _: get_scheduler().loop.call_later(interval, schedule_pool_index_refresh, interval))
+
+def cache_pool_keys(pool_keys_list):
+    for pool_keys in pool_keys_list:
+        pool_keys_cache.set(str(pool_keys["amm_id"]), pool_keys)
+    pool_keys_cache.save(pool_keys_cache_path)
+
+def invalidate_pool_keys(amm_id):
+    if pool_keys_cache.invalidate(str(amm_id)):
+        logging.info(f"Invalidated cached pool keys for {amm_id}")
+        pool_keys_cache.save(pool_keys_cache_path)
+
+
+if __name__ == "__main__":
+    # python pools.py import <snapshot.json> | python pools.py refresh
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) == 3 and sys.argv[1] == "import":
+        import_pool_snapshot(sys.argv[2])
+    elif len(sys.argv) == 2 and sys.argv[1] == "refresh":
+        schedule(refresh_pool_index(), name="Refresh pool index").result()
+    else:
+        print("usage: python pools.py import <snapshot.json> | python pools.py refresh")
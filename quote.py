@@ -0,0 +1,80 @@
+from config import *
+from constants import *
+from rpc import *
+from decoders import *
+from cache import TTLCache
+
+import logging
+import numpy as np
+import pandas as pd
+
+pool_state_cache = TTLCache(256, pool_state_ttl)
+
+def decode_pool_state(amm_id, amm_data, base_vault_data, quote_vault_data):
+    amm = LIQUIDITY_STATE_DECODER_V4.parse(amm_data, ["coinDecimals", "pcDecimals", "swapFeeNumerator", "swapFeeDenominator", "needTakePnlCoin", "needTakePnlPc"])
+    return {
+        "amm_id": str(amm_id),
+        # pnl owed to the protocol sits in the vaults but is not tradable liquidity
+        "base_reserve": ACCOUNT_DECODER.read(base_vault_data, "amount") - amm.needTakePnlCoin,
+        "quote_reserve": ACCOUNT_DECODER.read(quote_vault_data, "amount") - amm.needTakePnlPc,
+        "base_decimals": amm.coinDecimals,
+        "quote_decimals": amm.pcDecimals,
+        "swap_fee_numerator": amm.swapFeeNumerator,
+        "swap_fee_denominator": amm.swapFeeDenominator,
+    }
+
+def update_pool_state(pool_state, ttl=None):
+    pool_state_cache.set(pool_state["amm_id"], pool_state, ttl)
+
+def forget_pool_state(amm_id):
+    pool_state_cache.invalidate(str(amm_id))
+
+async def get_pool_state(pool_keys):
+    """Reserves and fees of the pool, from cache while fresh, otherwise one getMultipleAccounts call."""
+    pool_state = pool_state_cache.get(str(pool_keys["amm_id"]))
+    if pool_state:
+        return pool_state
+    amm_data, base_vault_data, quote_vault_data = await get_multiple_accounts([pool_keys["amm_id"], pool_keys["base_vault"], pool_keys["quote_vault"]], commitment="processed")
+    if not (amm_data and base_vault_data and quote_vault_data):
+        raise ValueError(f"Pool accounts missing for {pool_keys['amm_id']}")
+    pool_state = decode_pool_state(pool_keys["amm_id"], amm_data, base_vault_data, quote_vault_data)
+    update_pool_state(pool_state)
+    return pool_state
+
+def quote_swap(pool_state, amounts_in, base_in, slippage_bps=swap_slippage_bps):
+    """Constant-product quote for one raw amount or a whole ladder of them.
+
+    Returns a DataFrame with amount_in, fee, amount_out, min_amount_out (exact integers, rounded the way the program does)
+    and price_impact (fraction of the spot price lost to the trade, fees excluded)."""
+    reserve_in, reserve_out = (pool_state["base_reserve"], pool_state["quote_reserve"]) if base_in else (pool_state["quote_reserve"], pool_state["base_reserve"])
+    if reserve_in <= 0 or reserve_out <= 0:
+        raise ValueError(f"Pool {pool_state['amm_id']} has no liquidity")
+
+    # object arrays keep python ints, so u64 * u64 products can't overflow
+    amounts_in = np.atleast_1d(np.asarray(amounts_in, dtype=object))
+    numerator, denominator = pool_state["swap_fee_numerator"], pool_state["swap_fee_denominator"]
+    fees = (amounts_in * numerator + denominator - 1) // denominator
+    net_in = amounts_in - fees
+    amounts_out = reserve_out * net_in // (reserve_in + net_in)
+    min_amounts_out = amounts_out * (10_000 - slippage_bps) // 10_000
+
+    spot_price = reserve_out / reserve_in
+    execution_price = amounts_out.astype(np.float64) / np.maximum(net_in.astype(np.float64), 1)
+    return pd.DataFrame({
+        "amount_in": amounts_in,
+        "fee": fees,
+        "amount_out": amounts_out,
+        "min_amount_out": min_amounts_out,
+        "price_impact": 1 - execution_price / spot_price,
+    })
+
+async def get_min_amount_out(pool_keys, amount_in, input_mint, slippage_bps=swap_slippage_bps):
+    """min_amount_out for a single swap, or None if the pool can't be quoted; such a swap must not be sent unprotected."""
+    try:
+        pool_state = await get_pool_state(pool_keys)
+        quote = quote_swap(pool_state, amount_in, str(input_mint) == str(pool_keys["base_mint"]), slippage_bps).iloc[0]
+        logging.info(f"Quoted {quote.amount_in} -> {quote.amount_out} (min {quote.min_amount_out}, impact {quote.price_impact:.2%})")
+        return int(quote.min_amount_out)
+    except Exception as e:
+        logging.error(f"Could not quote swap, not sending it: {e}")
+        return None
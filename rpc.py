@@ -0,0 +1,259 @@
+from solana.rpc.core import RPCException
+from solders.signature import Signature
+
+from config import *
+from tasks import on_shutdown
+
+import asyncio
+import base64
+import httpx
+import logging
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+MAX_MULTIPLE_ACCOUNTS = 100
+# never hedged: a duplicate would be harmless for a signed transaction, but not worth the extra send
+RPC_WRITE_METHODS = {"sendTransaction", "requestAirdrop"}
+# nor are scans too heavy to run twice (a full getProgramAccounts of the amm program, see pools.py)
+RPC_UNHEDGED_METHODS = RPC_WRITE_METHODS | {"getProgramAccounts"}
+
+# one pooled httpx client (keep-alive connections) and one batcher per endpoint; like every shared session and
+# background task they live on the scheduler loop (see tasks.py), which is where all rpc calls run
+_clients = {}
+_batchers = {}
+_routers = {}
+# batch and routing records; logs.py lets its debug records through to the log index
+rpc_logger = logging.getLogger("rpc")
+
+def get_client(endpoint=rpc):
+    """Return the shared httpx client posting to `endpoint`, opening its connection pool on first use."""
+    if endpoint not in _clients:
+        logging.info(f"Opening rpc session (max {rpc_max_connections} connections)")
+        _clients[endpoint] = httpx.AsyncClient(
+            timeout=rpc_timeout,
+            limits=httpx.Limits(
+                max_connections=rpc_max_connections,
+                max_keepalive_connections=rpc_max_keepalive_connections,
+                keepalive_expiry=rpc_keepalive_expiry,
+            ),
+        )
+    return _clients[endpoint]
+
+@on_shutdown
+async def close_clients():
+    """Flush pending batches and close every pooled rpc session."""
+    for batcher in _batchers.values():
+        batcher.flush()
+    _batchers.clear()
+    for endpoint, client in list(_clients.items()):
+        del _clients[endpoint]
+        await client.aclose()
+
+
+class RpcBatcher:
+    """Coalesces json-rpc calls made within `window` seconds into a single batch post."""
+
+    def __init__(self, endpoint, window=rpc_batch_window, max_size=rpc_max_batch_size):
+        self.endpoint = endpoint
+        self.window = window
+        self.max_size = max_size
+        self.pending = []
+        self.flush_handle = None
+
+    def call(self, method, params):
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((method, params, future))
+        if len(self.pending) >= self.max_size:
+            self.flush()
+        elif self.flush_handle is None:
+            self.flush_handle = asyncio.get_running_loop().call_later(self.window, self.flush)
+        return future
+
+    def flush(self):
+        if self.flush_handle:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        batch, self.pending = self.pending, []
+        if batch:
+            asyncio.ensure_future(self.send(batch))
+
+    async def send(self, batch):
+        payload = [{"jsonrpc": "2.0", "id": i, "method": method, "params": params} for i, (method, params, _) in enumerate(batch)]
+        methods = ",".join(dict.fromkeys(method for method, _, _ in batch))
+        started = time.perf_counter()
+        try:
+            results = await get_router(self.endpoint).post(payload, hedge=not any(method in RPC_UNHEDGED_METHODS for method, _, _ in batch))
+        except Exception as e:
+            latency_ms = round((time.perf_counter() - started) * 1000, 1)
+            rpc_logger.error(f"Batch of {len(batch)} rpc calls failed: {e}", extra={"method": methods, "latency_ms": latency_ms})
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        latency_ms = round((time.perf_counter() - started) * 1000, 1)
+        rpc_logger.debug(f"Batch of {len(batch)} rpc calls answered in {latency_ms}ms", extra={"method": methods, "latency_ms": latency_ms})
+        results_by_id = {result.get("id"): result for result in results}
+        for i, (method, _, future) in enumerate(batch):
+            if future.done():
+                continue
+            result = results_by_id.get(i)
+            if result is None:
+                future.set_exception(RPCException(f"No response for {method}"))
+            elif "error" in result:
+                future.set_exception(RPCException(result["error"]))
+            else:
+                future.set_result(result["result"])
+
+
+def endpoint_name(endpoint):
+    # just the host, rpc urls often carry an api key
+    return urlparse(endpoint).netloc or endpoint
+
+
+class EndpointHealth:
+    """Recent latencies and failures of one endpoint."""
+
+    def __init__(self, endpoint, window=rpc_health_window):
+        self.endpoint = endpoint
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.failures = 0
+        self.down_until = 0
+
+    def record_success(self, latency):
+        self.latencies.append(latency)
+        self.outcomes.append(0)
+        self.failures = 0
+
+    def record_cancelled(self, timeout=rpc_timeout):
+        # a hedge loser's real latency is unknown, only that it was beaten; its time so far would make it look fast
+        self.latencies.append(timeout)
+
+    def record_failure(self, error, max_failures=rpc_max_failures, cooldown=rpc_failure_cooldown):
+        self.outcomes.append(1)
+        self.failures += 1
+        if self.failures >= max_failures:
+            self.down_until = time.monotonic() + cooldown
+            self.failures = 0
+            logging.warning(f"Rpc endpoint {endpoint_name(self.endpoint)} resting for {cooldown}s after {max_failures} failures: {error}")
+
+    def healthy(self):
+        return time.monotonic() >= self.down_until
+
+    def error_rate(self):
+        return sum(self.outcomes) / len(self.outcomes) if self.outcomes else 0
+
+    def latency_quantile(self, quantile):
+        if not self.latencies:
+            return 0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(quantile * len(ordered)))]
+
+    def score(self):
+        """Expected cost of a call, lower is better: median latency, inflated by the recent error rate.
+
+        Untried endpoints score 0, so they get sampled; one that has only failed counts as taking the full rpc_timeout."""
+        if self.latencies:
+            latency = self.latency_quantile(0.5)
+        else:
+            latency = rpc_timeout if self.outcomes else 0
+        return latency * (1 + 4 * self.error_rate())
+
+    def hedge_delay(self, quantile=rpc_hedge_quantile, min_delay=rpc_hedge_min_delay, max_delay=rpc_hedge_max_delay):
+        # too few samples for a meaningful tail: only hedge calls that are clearly stuck
+        if len(self.latencies) < 20:
+            return max_delay
+        return min(max_delay, max(min_delay, self.latency_quantile(quantile)))
+
+
+class RpcRouter:
+    """Posts json-rpc payloads to the best of several endpoints.
+
+    Endpoints are ranked by EndpointHealth.score, resting ones last. A read still unanswered after the endpoint's
+    hedge delay is sent to the next endpoint as well, and the first answer wins; a failed post moves on to the next
+    endpoint right away. Losers that get cancelled count as a rpc_timeout latency sample."""
+
+    def __init__(self, endpoints):
+        self.endpoints = list(dict.fromkeys(endpoints))
+        self.health = {endpoint: EndpointHealth(endpoint) for endpoint in self.endpoints}
+
+    def ranked(self):
+        healthy = [health for health in self.health.values() if health.healthy()]
+        resting = sorted((health for health in self.health.values() if not health.healthy()), key=lambda health: health.down_until)
+        return [health.endpoint for health in sorted(healthy, key=lambda health: health.score()) + resting]
+
+    async def attempt(self, endpoint, payload):
+        health = self.health[endpoint]
+        started = time.perf_counter()
+        try:
+            response = await get_client(endpoint).post(endpoint, json=payload)
+            response.raise_for_status()
+            results = response.json()
+            if isinstance(results, dict):
+                # some providers answer a rejected batch with a single error object
+                raise RPCException(results.get("error", results))
+        except asyncio.CancelledError:
+            health.record_cancelled()
+            raise
+        except Exception as e:
+            health.record_failure(e)
+            raise
+        health.record_success(time.perf_counter() - started)
+        return results
+
+    async def post(self, payload, hedge=True):
+        remaining = self.ranked()
+        endpoint = remaining.pop(0)
+        pending = {asyncio.ensure_future(self.attempt(endpoint, payload))}
+        error = None
+        try:
+            while True:
+                delay = self.health[endpoint].hedge_delay() if hedge and remaining else None
+                done, pending = await asyncio.wait(pending, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+                # a failure fails over, a timeout hedges
+                if remaining:
+                    endpoint = remaining.pop(0)
+                    rpc_logger.debug(f"{'Failing over' if done else 'Hedging'} to {endpoint_name(endpoint)}")
+                    pending.add(asyncio.ensure_future(self.attempt(endpoint, payload)))
+                if not pending:
+                    raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+def get_router(endpoint=rpc):
+    """The router for `endpoint`: every one of rpc_endpoints for the default rpc, just that endpoint for any other."""
+    if endpoint not in _routers:
+        _routers[endpoint] = RpcRouter([rpc] + rpc_endpoints if endpoint == rpc else [endpoint])
+    return _routers[endpoint]
+
+def get_batcher(endpoint=rpc):
+    if endpoint not in _batchers:
+        _batchers[endpoint] = RpcBatcher(endpoint)
+    return _batchers[endpoint]
+
+async def rpc_call(method, params=None, endpoint=rpc):
+    """Raw json-rpc call routed through the batcher; returns the decoded `result` field."""
+    return await get_batcher(endpoint).call(method, params or [])
+
+async def get_multiple_accounts(pubkeys, commitment=None, endpoint=rpc):
+    """Raw data (None for missing accounts) of every pubkey, in order; chunks past the 100 key limit share one rpc batch."""
+    keys = [str(pubkey) for pubkey in pubkeys]
+    opts = {"encoding": "base64", "commitment": commitment} if commitment else {"encoding": "base64"}
+    chunks = await asyncio.gather(*[
+        rpc_call("getMultipleAccounts", [keys[i:i + MAX_MULTIPLE_ACCOUNTS], opts], endpoint)
+        for i in range(0, len(keys), MAX_MULTIPLE_ACCOUNTS)
+    ])
+    return [base64.b64decode(account["data"][0]) if account else None for chunk in chunks for account in chunk["value"]]
+
+async def send_raw_transaction(transaction, skip_preflight=True, preflight_commitment="processed", endpoint=rpc):
+    """sendTransaction of a signed transaction through the router: never hedged, but failed over like any other call."""
+    opts = {"encoding": "base64", "skipPreflight": skip_preflight, "preflightCommitment": preflight_commitment}
+    return Signature.from_string(await rpc_call("sendTransaction", [base64.b64encode(bytes(transaction)).decode(), opts], endpoint))
@@ -0,0 +1,242 @@
+from solana.rpc.core import RPCException
+
+from config import *
+from constants import *
+from rpc import *
+from decoders import *
+from quote import *
+from accounts import *
+from tasks import get_scheduler, on_shutdown
+
+import asyncio
+import base64
+import json
+import logging
+import websockets
+
+# owner field of an spl token account sits right after its 32 byte mint
+TOKEN_ACCOUNT_OWNER_OFFSET = 32
+
+_feeds = {}
+# amm id -> subscription keys of the pools watch_pool keeps current in the quote cache
+_watched_pools = {}
+
+def notification_account(value):
+    """(lamports, raw data) of an account as carried by account/program notifications; data is None once it is gone."""
+    if not value:
+        return 0, None
+    data = value.get("data")
+    return value.get("lamports", 0), base64.b64decode(data[0]) if data and value.get("lamports") else None
+
+
+class AccountFeed:
+    """One websocket connection multiplexing accountSubscribe/programSubscribe; everything is resubscribed after a reconnect.
+
+    Callbacks are called as `callback(pubkey, lamports, data)` with the raw account data."""
+
+    def __init__(self, endpoint=ws_rpc, commitment=feed_commitment, reconnect_delay=feed_reconnect_delay, on_disconnect=None):
+        self.endpoint = endpoint
+        self.commitment = commitment
+        self.reconnect_delay = reconnect_delay
+        # called whenever the connection drops: changes until the resubscribe are never notified
+        self.on_disconnect = on_disconnect
+        # key -> (method, params, callback); key is the subscribe request itself, so equal subscriptions share one slot
+        self.subscriptions = {}
+        self.requests = {}
+        self.active = {}
+        self.next_id = 0
+        self.websocket = None
+        self.task = None
+
+    def subscribe_account(self, pubkey, callback):
+        params = [str(pubkey), {"encoding": "base64", "commitment": self.commitment}]
+        return self.subscribe("accountSubscribe", params, callback)
+
+    def subscribe_program(self, program_id, filters, callback):
+        params = [str(program_id), {"encoding": "base64", "commitment": self.commitment, "filters": filters}]
+        return self.subscribe("programSubscribe", params, callback)
+
+    def subscribe(self, method, params, callback):
+        key = json.dumps([method, params])
+        existing = key in self.subscriptions
+        self.subscriptions[key] = (method, params, callback)
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self.run())
+        elif not existing and self.websocket is not None:
+            asyncio.ensure_future(self.send_subscribe(key))
+        return key
+
+    async def unsubscribe(self, key):
+        if self.subscriptions.pop(key, None) is None:
+            return
+        for subscription_id in [s for s, k in self.active.items() if k == key]:
+            await self.send_unsubscribe(subscription_id, key)
+
+    async def send_subscribe(self, key):
+        method, params, _ = self.subscriptions[key]
+        self.next_id += 1
+        self.requests[self.next_id] = key
+        await self.websocket.send(json.dumps({"jsonrpc": "2.0", "id": self.next_id, "method": method, "params": params}))
+
+    async def send_unsubscribe(self, subscription_id, key):
+        self.active.pop(subscription_id, None)
+        if self.websocket is None:
+            return
+        self.next_id += 1
+        method = json.loads(key)[0].replace("Subscribe", "Unsubscribe")
+        try:
+            await self.websocket.send(json.dumps({"jsonrpc": "2.0", "id": self.next_id, "method": method, "params": [subscription_id]}))
+        except Exception as e:
+            logging.warning(f"Unsubscribe failed: {e}")
+
+    async def run(self):
+        while self.subscriptions:
+            try:
+                async with websockets.connect(self.endpoint) as websocket:
+                    logging.info(f"Account feed connected ({len(self.subscriptions)} subscriptions)")
+                    self.websocket = websocket
+                    for key in list(self.subscriptions):
+                        await self.send_subscribe(key)
+                    async for message in websocket:
+                        await self.handle(json.loads(message))
+                        if not self.subscriptions:
+                            break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.warning(f"Account feed disconnected: {e}")
+            finally:
+                if self.websocket is not None and self.on_disconnect:
+                    self.on_disconnect()
+                self.websocket = None
+                self.requests.clear()
+                self.active.clear()
+            if self.subscriptions:
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def handle(self, message):
+        if "id" in message:
+            key = self.requests.pop(message["id"], None)
+            if key is None:
+                return
+            if "error" in message:
+                logging.error(f"Subscription rejected: {RPCException(message['error'])}")
+            elif key in self.subscriptions:
+                self.active[message["result"]] = key
+            else:
+                # unsubscribed while the subscribe was in flight
+                await self.send_unsubscribe(message["result"], key)
+            return
+
+        params = message.get("params", {})
+        key = self.active.get(params.get("subscription"))
+        if key is None or key not in self.subscriptions:
+            return
+        method, subscribe_params, callback = self.subscriptions[key]
+        value = params["result"]["value"]
+        if message.get("method") == "programNotification":
+            pubkey, (lamports, data) = value["pubkey"], notification_account(value["account"])
+        else:
+            pubkey, (lamports, data) = subscribe_params[0], notification_account(value)
+        try:
+            callback(pubkey, lamports, data)
+        except Exception as e:
+            logging.error(f"Account feed callback failed for {pubkey}: {e}")
+
+    async def close(self):
+        """Drop every subscription and close the websocket."""
+        self.subscriptions.clear()
+        if self.task and not self.task.done():
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+
+def get_account_feed(endpoint=ws_rpc):
+    if endpoint not in _feeds:
+        _feeds[endpoint] = AccountFeed(endpoint, on_disconnect=forget_watched_pools)
+    return _feeds[endpoint]
+
+def forget_watched_pools():
+    # their cached reserves may miss changes from while the feed was down, so quotes go back to reading them over rpc
+    for amm_id in _watched_pools:
+        forget_pool_state(amm_id)
+
+@on_shutdown
+async def close_feeds():
+    while _feeds:
+        await _feeds.popitem()[1].close()
+
+def run_in_feed_loop(coro):
+    """Schedule `coro` on the scheduler's long-lived loop, where the feed and its subscriptions live; returns its concurrent future."""
+    return asyncio.run_coroutine_threadsafe(coro, get_scheduler().loop)
+
+
+async def watch_wallet(owner, on_update, endpoint=ws_rpc):
+    """Keep the SOL balance and token account snapshot of `owner` live.
+
+    `on_update(kind, key, value)` is called with ("sol", owner, ui balance) or ("token", mint, snapshot entry or None).
+    Returns the subscription keys for unwatch."""
+    feed = get_account_feed(endpoint)
+    owner = str(owner)
+
+    def on_wallet(pubkey, lamports, data):
+        on_update("sol", owner, lamports / LAMPORTS_PER_SOL)
+
+    def on_token_account(pubkey, lamports, data):
+        accounts = token_snapshots.get(owner, {}).get("accounts", {})
+        before = {mint for mint, entry in accounts.items() if entry["account"] == pubkey}
+        apply_token_account_update(owner, pubkey, data)
+        accounts = token_snapshots.get(owner, {}).get("accounts", {})
+        after = {mint for mint, entry in accounts.items() if entry["account"] == pubkey}
+        for mint in before | after:
+            on_update("token", mint, accounts.get(mint))
+
+    # closed accounts stop matching the owner filter, so closes still come from the trade functions' refresh
+    filters = [{"dataSize": ACCOUNT_LEN}, {"memcmp": {"offset": TOKEN_ACCOUNT_OWNER_OFFSET, "bytes": owner}}]
+    return [
+        feed.subscribe_account(owner, on_wallet),
+        feed.subscribe_program(TOKEN_PROGRAM, filters, on_token_account),
+    ]
+
+async def watch_pool(pool_keys, on_update=None, endpoint=ws_rpc):
+    """Push the amm and vault accounts of a pool into the quote cache as they change; `on_update(pool_state)` is optional."""
+    feed = get_account_feed(endpoint)
+    amm_id, base_vault, quote_vault = str(pool_keys["amm_id"]), str(pool_keys["base_vault"]), str(pool_keys["quote_vault"])
+    latest = {}
+
+    def publish():
+        if not all(latest.get(account) for account in (amm_id, base_vault, quote_vault)):
+            return
+        # kept current by the feed, so quotes can use it long after pool_state_ttl
+        pool_state = decode_pool_state(amm_id, latest[amm_id], latest[base_vault], latest[quote_vault])
+        update_pool_state(pool_state, watched_pool_state_ttl)
+        if on_update:
+            on_update(pool_state)
+
+    def on_account(pubkey, lamports, data):
+        latest[pubkey] = data
+        publish()
+
+    keys = [feed.subscribe_account(account, on_account) for account in (amm_id, base_vault, quote_vault)]
+    _watched_pools[amm_id] = keys
+    # the first notification only comes with the next change, so start from the current accounts
+    try:
+        for account, data in zip((amm_id, base_vault, quote_vault), await get_multiple_accounts([amm_id, base_vault, quote_vault], commitment="processed")):
+            latest.setdefault(account, data)
+        publish()
+    except Exception as e:
+        logging.warning(f"Could not prime pool state for {amm_id}: {e}")
+    return keys
+
+async def unwatch(keys, endpoint=ws_rpc):
+    feed = get_account_feed(endpoint)
+    for key in keys:
+        await feed.unsubscribe(key)
+    # an unwatched pool's reserves go stale, back to the short pool_state_ttl
+    for amm_id, pool_keys in list(_watched_pools.items()):
+        if set(pool_keys) <= set(keys):
+            del _watched_pools[amm_id]
+            forget_pool_state(amm_id)
@@ -0,0 +1,134 @@
+from config import *
+
+import asyncio
+import atexit
+import contextvars
+import itertools
+import logging
+import threading
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+# wallet of the running task; logs.py tags every record logged from it
+task_wallet = contextvars.ContextVar("task_wallet", default=None)
+# async closers of the shared sessions living on the scheduler loop (rpc.py, market.py, subscriptions.py), awaited on shutdown
+shutdown_hooks = []
+
+
+class TaskScheduler:
+    """Runs every UI task on one long-lived event loop in a daemon thread, so rpc sessions, caches and subscriptions outlive a callback.
+
+    A task submitted with a `key` cancels the still running task with the same key (a superseded validation, a stale reload);
+    tasks submitted for a `wallet` run at most `wallet_concurrency` at a time for that wallet."""
+
+    def __init__(self, wallet_concurrency=scheduler_wallet_concurrency):
+        self.wallet_concurrency = wallet_concurrency
+        self.loop = asyncio.new_event_loop()
+        self.ids = itertools.count(1)
+        # task id -> {"name", "wallet", "state"}, in submission order; this is what the ui shows
+        self.queue = {}
+        self.keyed = {}
+        self.wallet_slots = {}
+        self.listeners = []
+        threading.Thread(target=self.serve, name="scheduler", daemon=True).start()
+
+    def serve(self):
+        self.loop.run_forever()
+        self.loop.close()
+
+    def submit(self, coro, name=None, key=None, wallet=None):
+        """Schedule `coro` from any thread; returns its concurrent.futures.Future."""
+        name = name or getattr(coro, "__name__", "task")
+        return asyncio.run_coroutine_threadsafe(self.run(next(self.ids), coro, name, key, wallet), self.loop)
+
+    def cancel(self, key):
+        def cancel_keyed():
+            task = self.keyed.get(key)
+            if task:
+                task.cancel()
+        self.loop.call_soon_threadsafe(cancel_keyed)
+
+    async def run(self, task_id, coro, name, key, wallet):
+        task = asyncio.current_task()
+        task_wallet.set(wallet)
+        if key is not None:
+            previous = self.keyed.get(key)
+            if previous and not previous.done():
+                previous.cancel()
+            self.keyed[key] = task
+        self.set_state(task_id, name, wallet, "queued")
+        try:
+            if wallet is None:
+                self.set_state(task_id, name, wallet, "running")
+                return await coro
+            async with self.wallet_slots.setdefault(wallet, asyncio.Semaphore(self.wallet_concurrency)):
+                self.set_state(task_id, name, wallet, "running")
+                return await coro
+        except asyncio.CancelledError:
+            logging.info(f"Cancelled {name}")
+            raise
+        except Exception as e:
+            logging.error(f"{name} failed: {e}")
+            raise
+        finally:
+            # a task cancelled while still queued never started its coroutine
+            coro.close()
+            if key is not None and self.keyed.get(key) is task:
+                del self.keyed[key]
+            self.queue.pop(task_id, None)
+            self.notify()
+
+    def shutdown(self, timeout=scheduler_shutdown_timeout):
+        """Close the shared sessions on the loop, then stop it; get_scheduler registers this with atexit."""
+        if self.loop.is_closed():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self.close_sessions(), self.loop).result(timeout)
+        except Exception as e:
+            logging.error(f"Closing sessions failed: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    async def close_sessions(self):
+        for close in shutdown_hooks:
+            try:
+                await close()
+            except Exception as e:
+                logging.warning(f"{close.__name__} failed: {e}")
+
+    def set_state(self, task_id, name, wallet, state):
+        self.queue[task_id] = {"name": name, "wallet": wallet, "state": state}
+        self.notify()
+
+    def notify(self):
+        tasks = list(self.queue.values())
+        for listener in self.listeners:
+            try:
+                listener(tasks)
+            except Exception as e:
+                logging.warning(f"Task queue listener failed: {e}")
+
+
+def get_scheduler():
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = TaskScheduler()
+            atexit.register(_scheduler.shutdown)
+    return _scheduler
+
+def on_shutdown(close):
+    """Register an async `close()` to run on the scheduler loop when the app exits."""
+    shutdown_hooks.append(close)
+    return close
+
+def schedule(coro, name=None, key=None, wallet=None):
+    return get_scheduler().submit(coro, name, key, wallet)
+
+def format_task_queue(tasks):
+    """One line summary of the task queue for the ui, e.g. "Running: Buy (Wallet 1) | Queued: Sell (Wallet 1)"."""
+    parts = []
+    for state in ("running", "queued"):
+        names = [f"{task['name']} ({task['wallet']})" if task["wallet"] else task["name"] for task in tasks if task["state"] == state]
+        if names:
+            parts.append(f"{state.capitalize()}: {', '.join(names)}")
+    return " | ".join(parts)
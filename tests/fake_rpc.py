@@ -0,0 +1,100 @@
+from aiohttp import web
+
+import asyncio
+import json
+
+
+class FakeRpc:
+    """Local json-rpc node: batched posts on / and subscriptions over a websocket on /ws.
+
+    `statuses` maps a signature to what getSignatureStatuses reports for it (None until it lands); `notifications`
+    maps a signature to the status pushed to its subscribers, `notify_delay` seconds after they subscribe.
+    Account and program subscriptions are kept in `subscriptions` (id -> (method, params)) until unsubscribed or
+    disconnected; `push` sends them a notification."""
+
+    def __init__(self, notify_delay=0.1, delay=0, status=200):
+        self.notify_delay = notify_delay
+        # every post is answered after `delay` seconds, with an empty `status` response unless that is 200
+        self.delay = delay
+        self.status = status
+        self.statuses = {}
+        self.notifications = {}
+        self.handlers = {"getSignatureStatuses": self.get_signature_statuses}
+        self.calls = []
+        self.subscriptions = {}
+        self.unsubscribed = []
+        self.next_subscription = 100
+        self.websockets = set()
+        self.runner = None
+        self.url = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/", self.handle_post)
+        app.router.add_get("/ws", self.handle_websocket)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url, self.ws_url = f"http://127.0.0.1:{port}/", f"ws://127.0.0.1:{port}/ws"
+        return self
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+    def get_signature_statuses(self, params):
+        return {"context": {"slot": 1}, "value": [self.statuses.get(signature) for signature in params[0]]}
+
+    async def handle_post(self, request):
+        payload = await request.json()
+        self.calls.extend(call["method"] for call in payload)
+        await asyncio.sleep(self.delay)
+        if self.status != 200:
+            return web.Response(status=self.status)
+        responses = []
+        for call in payload:
+            responses.append({"jsonrpc": "2.0", "id": call["id"], "result": self.handlers[call["method"]](call["params"])})
+        return web.json_response(responses)
+
+    async def handle_websocket(self, request):
+        websocket = web.WebSocketResponse()
+        await websocket.prepare(request)
+        self.websockets.add(websocket)
+        try:
+            async for message in websocket:
+                call = json.loads(message.data)
+                if call["method"] == "signatureSubscribe":
+                    await self.subscribe_signature(websocket, call)
+                elif call["method"].endswith("Unsubscribe"):
+                    self.unsubscribed.append((call["method"], call["params"][0]))
+                    self.subscriptions.pop(call["params"][0], None)
+                    await websocket.send_json({"jsonrpc": "2.0", "id": call["id"], "result": True})
+                else:
+                    self.next_subscription += 1
+                    self.subscriptions[self.next_subscription] = (call["method"], call["params"])
+                    await websocket.send_json({"jsonrpc": "2.0", "id": call["id"], "result": self.next_subscription})
+        finally:
+            self.websockets.discard(websocket)
+        return websocket
+
+    async def subscribe_signature(self, websocket, call):
+        signature = call["params"][0]
+        await websocket.send_json({"jsonrpc": "2.0", "id": call["id"], "result": 7})
+        if signature in self.notifications:
+            await asyncio.sleep(self.notify_delay)
+            await websocket.send_json({"jsonrpc": "2.0", "method": "signatureNotification", "params": {"subscription": 7, "result": {"context": {"slot": 2}, "value": self.notifications[signature]}}})
+
+    def subscription_id(self, method, target):
+        """Id of the live `method` subscription for an account or program."""
+        return next(id for id, (m, params) in self.subscriptions.items() if m == method and params[0] == target)
+
+    async def push(self, subscription_id, method, value):
+        for websocket in list(self.websockets):
+            await websocket.send_json({"jsonrpc": "2.0", "method": method, "params": {"subscription": subscription_id, "result": {"context": {"slot": 2}, "value": value}}})
+
+    async def disconnect(self):
+        """Drop every websocket, like a node restart; their subscriptions are gone with them."""
+        self.subscriptions.clear()
+        for websocket in list(self.websockets):
+            await websocket.close()
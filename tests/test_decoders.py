@@ -0,0 +1,82 @@
+import base64
+import random
+
+import pytest
+from construct import Array, BytesInteger
+
+import layouts
+from decoders import *
+
+LAYOUTS = {name: getattr(layouts, name) for name in dir(layouts) if name.endswith("_LAYOUT") or "_LAYOUT_" in name}
+LAYOUTS = {name: layout for name, layout in LAYOUTS.items() if hasattr(layout, "subcons")}
+
+
+def random_buffer(layout, rng):
+    data = bytearray(rng.randbytes(layout.sizeof()))
+    offset = 0
+    for subcon in layout.subcons:
+        if getattr(subcon, "subcon", None) is ACCOUNT_FLAGS_LAYOUT:
+            # only the 7 defined flag bits may be set, the rest is a Const(0)
+            data[offset:offset + 8] = (data[offset] & 0x7F).to_bytes(8, "little")
+        offset += subcon.sizeof()
+    return bytes(data)
+
+def record_value(record, subcon):
+    """The numpy field as construct would have parsed it."""
+    value, field = record[subcon.name], subcon.subcon
+    if field is ACCOUNT_FLAGS_LAYOUT:
+        return {name: bool(int(value) >> i & 1) for i, name in enumerate(ACCOUNT_FLAG_NAMES)}
+    if isinstance(field, BytesInteger):
+        return int.from_bytes(bytes(value), "little" if field.swapped else "big", signed=field.signed)
+    if isinstance(field, Array) and value.dtype.kind == "V":
+        raw, length = bytes(value), field.subcon.sizeof()
+        return [raw[i:i + length] for i in range(0, len(raw), length)]
+    if value.dtype.kind == "V":
+        return bytes(value)
+    if isinstance(field, Array):
+        return [int(item) for item in value]
+    return int(value)
+
+def construct_value(value):
+    if isinstance(value, dict):
+        return {name: item for name, item in value.items() if name != "_io"}
+    return list(value) if isinstance(value, list) else value
+
+
+@pytest.mark.parametrize("name", sorted(LAYOUTS))
+def test_bulk_decode_matches_construct(name):
+    layout, rng = LAYOUTS[name], random.Random(name)
+    blobs = [random_buffer(layout, rng) for _ in range(20)]
+    records, valid = bulk_decode(blobs, layout)
+    assert valid.all()
+    for blob, record in zip(blobs, records):
+        parsed = layout.parse(blob)
+        for subcon in layout.subcons:
+            if getattr(subcon, "name", None):
+                assert record_value(record, subcon) == construct_value(parsed[subcon.name]), subcon.name
+
+
+@pytest.mark.parametrize("name", sorted(LAYOUTS))
+def test_fast_layout_matches_construct(name):
+    layout, rng = LAYOUTS[name], random.Random(name)
+    decoder = FastLayout(layout)
+    for _ in range(20):
+        blob = random_buffer(layout, rng)
+        expected = {key: value for key, value in layout.parse(blob).items() if key != "_io"}
+        assert dict(decoder.parse(blob)) == expected
+
+
+def test_bulk_decode_keeps_rows_aligned_with_short_and_missing_blobs():
+    rng = random.Random(0)
+    good = [random_buffer(ACCOUNT_LAYOUT, rng) for _ in range(3)]
+    blobs = [good[0], b"short", None, good[1], good[2] + b"trailing"]
+    records, valid = bulk_decode(blobs, ACCOUNT_LAYOUT, ["mint", "amount"])
+    assert valid.tolist() == [True, False, False, True, True]
+    assert len(records) == len(blobs)
+    assert bytes(records["mint"][3]) == ACCOUNT_LAYOUT.parse(good[1]).mint
+    assert int(records["amount"][1]) == 0
+
+
+def test_account_blobs_keeps_missing_accounts_in_place():
+    data = {"data": [base64.b64encode(b"abc").decode(), "base64"]}
+    assert account_blobs([{"pubkey": "a", "account": data}, None, data]) == [b"abc", None, b"abc"]
@@ -0,0 +1,117 @@
+import time
+
+import pytest
+from aiohttp import web
+
+import market
+from market import GeckoClient, TokenBucket
+from tasks import schedule
+
+
+def run(coro, timeout=10):
+    return schedule(coro).result(timeout)
+
+
+class FakeGecko:
+    """Local GeckoTerminal stub: the first `throttled` requests get a 429 with `retry_after`, then token and ohlcv data."""
+
+    def __init__(self, throttled=0, retry_after="0"):
+        self.throttled = throttled
+        self.retry_after = retry_after
+        self.requests = []
+        self.runner = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/networks/solana/tokens/multi/{mints}", self.tokens)
+        app.router.add_get("/networks/solana/pools/{pool}/ohlcv/{timeframe}", self.ohlcv)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        return self
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+    def throttle(self, request):
+        self.requests.append((time.monotonic(), request.path))
+        if self.throttled:
+            self.throttled -= 1
+            return web.json_response({"errors": [{"status": "429"}]}, status=429, headers={"Retry-After": self.retry_after})
+
+    async def tokens(self, request):
+        # mints starting with "unknown" are not listed, like tokens GeckoTerminal has never seen
+        mints = [mint for mint in request.match_info["mints"].split(",") if not mint.startswith("unknown")]
+        return self.throttle(request) or web.json_response({"data": [{"attributes": {"address": mint, "price_usd": "1.5"}} for mint in mints]})
+
+    async def ohlcv(self, request):
+        return self.throttle(request) or web.json_response({"data": {"attributes": {"ohlcv_list": [[1, 1, 2, 0.5, 1.5, 100]]}}})
+
+
+@pytest.fixture
+def gecko():
+    market.token_cache.clear()
+    market.ohlcv_cache.clear()
+    fake = run(FakeGecko().start())
+    client = GeckoClient(base_url=fake.url, bucket=TokenBucket(1000, 1000), max_retries=2)
+    yield fake, client
+    run(client.close())
+    run(fake.stop())
+
+
+def test_retries_a_429_after_its_retry_after(gecko):
+    fake, client = gecko
+    fake.throttled = 1
+    started = time.monotonic()
+    response = run(client.get_ohlcv("pool", "token"))
+    # Retry-After: 0 beats the 1s backoff used without the header
+    assert time.monotonic() - started < 0.5
+    assert len(fake.requests) == 2
+    assert response["data"]["attributes"]["ohlcv_list"]
+
+
+def test_gives_up_after_max_retries(gecko):
+    fake, client = gecko
+    fake.throttled = 10
+    with pytest.raises(Exception, match="429"):
+        run(client.get_ohlcv("pool", "token"))
+    assert len(fake.requests) == client.max_retries + 1
+
+
+def test_token_bucket_spaces_requests_past_the_burst(gecko):
+    fake, client = gecko
+    client.bucket = TokenBucket(rate=20, capacity=2)
+
+    async def burst():
+        for i in range(6):
+            await client.get_ohlcv(f"pool{i}", "token")
+
+    run(burst())
+    times = [at for at, _ in fake.requests]
+    # two requests go out at once, the other four wait 1/20s each for a token
+    assert times[1] - times[0] < 0.04
+    assert times[-1] - times[0] >= 4 / 20 - 0.01
+
+
+def test_cached_responses_are_not_requested_again(gecko):
+    fake, client = gecko
+    run(client.get_ohlcv("pool", "token"))
+    run(client.get_ohlcv("pool", "token"))
+    run(client.get_tokens(["mint1", "unknown1"]))
+    tokens = run(client.get_tokens(["mint1", "unknown1"]))
+    assert len(fake.requests) == 2
+    assert tokens == {"mint1": {"address": "mint1", "price_usd": "1.5"}, "unknown1": {}}
+
+
+def test_get_tokens_batches_missing_mints_30_per_request(gecko):
+    fake, client = gecko
+    market.token_cache.set("mint0", {"address": "mint0", "price_usd": "2"})
+    mints = [f"mint{i}" for i in range(65)]
+    tokens = run(client.get_tokens(mints + ["mint3"]))
+    batches = [path.rsplit("/", 1)[1].split(",") for _, path in fake.requests]
+    assert sorted(len(batch) for batch in batches) == [4, 30, 30]
+    assert sorted(mint for batch in batches for mint in batch) == sorted(mints[1:])
+    assert list(tokens) == mints
+    assert tokens["mint0"]["price_usd"] == "2"
@@ -0,0 +1,86 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import cache
+import config
+import quote
+
+POOL_KEYS = {"amm_id": "amm", "base_vault": "base_vault", "quote_vault": "quote_vault", "base_mint": "token", "quote_mint": "wsol"}
+# 1000 tokens (6 decimals) against 50 SOL, 0.25% swap fee
+POOL_STATE = {
+    "amm_id": "amm", "base_reserve": 1_000_000_000, "quote_reserve": 50_000_000_000, "base_decimals": 6, "quote_decimals": 9,
+    "swap_fee_numerator": 25, "swap_fee_denominator": 10_000,
+}
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    quote.pool_state_cache.clear()
+    yield
+    quote.pool_state_cache.clear()
+
+@pytest.fixture
+def rpc_calls(monkeypatch):
+    calls = []
+
+    async def get_multiple_accounts(pubkeys, commitment=None):
+        calls.append(pubkeys)
+        raise ConnectionError("rpc down")
+
+    monkeypatch.setattr(quote, "get_multiple_accounts", get_multiple_accounts)
+    return calls
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_base_in_quote_matches_the_constant_product_by_hand():
+    # fee = ceil(10_000_007 * 25 / 10_000) = 25_001, net in = 9_975_006
+    # out = floor(50e9 * 9_975_006 / (1e9 + 9_975_006)) = 493_824_398, min out at 5% slippage = 469_133_178
+    row = quote.quote_swap(POOL_STATE, 10_000_007, base_in=True, slippage_bps=500).iloc[0]
+    assert (row.fee, row.amount_out, row.min_amount_out) == (25_001, 493_824_398, 469_133_178)
+
+
+def test_quote_in_quote_matches_the_constant_product_by_hand():
+    # fee = ceil(123_456_789 * 25 / 10_000) = 308_642, net in = 123_148_147
+    # out = floor(1e9 * 123_148_147 / (50e9 + 123_148_147)) = 2_456_911, min out at 5% slippage = 2_334_065
+    row = quote.quote_swap(POOL_STATE, 123_456_789, base_in=False, slippage_bps=500).iloc[0]
+    assert (row.fee, row.amount_out, row.min_amount_out) == (308_642, 2_456_911, 2_334_065)
+
+
+def test_a_ladder_is_quoted_row_by_row():
+    ladder = quote.quote_swap(POOL_STATE, [10_000_007, 10, 10**12], base_in=True)
+    assert ladder.amount_out[0] == 493_824_398
+    # 10 raw units pay a whole unit of fee after rounding up
+    assert ladder.fee[1] == 1
+    assert ladder.price_impact[2] > ladder.price_impact[0] > 0
+
+
+def test_min_amount_out_uses_fresh_reserves_without_rpc(rpc_calls):
+    quote.update_pool_state(POOL_STATE)
+    assert run(quote.get_min_amount_out(POOL_KEYS, 10_000_007, "token", slippage_bps=500)) == 469_133_178
+    assert run(quote.get_min_amount_out(POOL_KEYS, 123_456_789, "wsol", slippage_bps=500)) == 2_334_065
+    assert rpc_calls == []
+
+
+def test_unquotable_pools_give_none(rpc_calls):
+    # reserves unknown and rpc down
+    assert run(quote.get_min_amount_out(POOL_KEYS, 1_000, "token")) is None
+    assert len(rpc_calls) == 1
+    # a drained pool
+    quote.update_pool_state(dict(POOL_STATE, quote_reserve=0))
+    assert run(quote.get_min_amount_out(POOL_KEYS, 1_000, "token")) is None
+
+
+def test_reserves_kept_current_by_the_feed_outlive_pool_state_ttl(monkeypatch, rpc_calls):
+    quote.update_pool_state(POOL_STATE, config.watched_pool_state_ttl)
+    later = cache.time.time() + config.pool_state_ttl + 60
+    monkeypatch.setattr(cache, "time", SimpleNamespace(time=lambda: later))
+    assert run(quote.get_min_amount_out(POOL_KEYS, 10_000_007, "token", slippage_bps=500)) == 469_133_178
+    assert rpc_calls == []
+
+    quote.forget_pool_state("amm")
+    assert run(quote.get_min_amount_out(POOL_KEYS, 10_000_007, "token")) is None
+    assert len(rpc_calls) == 1
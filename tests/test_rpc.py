@@ -0,0 +1,96 @@
+import time
+
+import httpx
+import pytest
+
+import config
+import rpc
+from tasks import schedule
+from tests.fake_rpc import FakeRpc
+
+GET_SLOT = [{"jsonrpc": "2.0", "id": 0, "method": "getSlot", "params": []}]
+
+
+def run(coro, timeout=10):
+    return schedule(coro).result(timeout)
+
+
+@pytest.fixture
+def nodes():
+    started = []
+
+    def start(slot, **kwargs):
+        fake = run(FakeRpc(**kwargs).start())
+        fake.handlers.update({
+            "getSlot": lambda params: slot,
+            "sendTransaction": lambda params: str(rpc.Signature.default()),
+            "getProgramAccounts": lambda params: [],
+        })
+        started.append(fake)
+        return fake
+
+    yield start
+    for fake in started:
+        run(fake.stop())
+
+
+def slot_of(results):
+    return results[0]["result"]
+
+
+def test_fails_over_from_an_endpoint_answering_500(nodes):
+    broken, healthy = nodes(1, status=500), nodes(2)
+    router = rpc.RpcRouter([broken.url, healthy.url])
+    assert slot_of(run(router.post(GET_SLOT))) == 2
+    assert broken.calls == ["getSlot"]
+    assert router.health[broken.url].outcomes[-1] == 1
+    assert router.ranked()[0] == healthy.url
+
+
+def test_hedges_after_the_p95_delay_and_the_faster_endpoint_wins(nodes):
+    slow, fast = nodes(1, delay=2), nodes(2)
+    router = rpc.RpcRouter([slow.url, fast.url])
+    # history ranks the slow node first, with a 50ms p95
+    for _ in range(20):
+        router.health[slow.url].record_success(0.05)
+        router.health[fast.url].record_success(0.1)
+    assert router.ranked()[0] == slow.url
+
+    started = time.perf_counter()
+    assert slot_of(run(router.post(GET_SLOT))) == 2
+    assert 0.05 <= time.perf_counter() - started < 1
+    assert slow.calls == fast.calls == ["getSlot"]
+    # the cancelled loser gets a timeout sample rather than its (short) time so far
+    time.sleep(0.1)
+    assert router.health[slow.url].latencies[-1] == config.rpc_timeout
+
+
+def test_a_cancelled_loser_without_samples_is_not_ranked_first():
+    router = rpc.RpcRouter(["http://a/", "http://b/"])
+    router.health["http://a/"].record_success(0.2)
+    router.health["http://b/"].record_cancelled()
+    assert router.ranked() == ["http://a/", "http://b/"]
+
+
+def test_reraises_when_every_endpoint_fails(nodes):
+    first, second = nodes(1, status=500), nodes(2, status=502)
+    router = rpc.RpcRouter([first.url, second.url])
+    with pytest.raises(httpx.HTTPStatusError):
+        run(router.post(GET_SLOT))
+    assert first.calls == second.calls == ["getSlot"]
+
+
+@pytest.mark.parametrize("method, params", [("sendTransaction", ["AAAA", {"encoding": "base64"}]), ("getProgramAccounts", [str(rpc.Signature.default())])])
+def test_unhedged_methods_are_sent_once(nodes, monkeypatch, method, params):
+    slow, fast = nodes(1, delay=0.5), nodes(2)
+    router = rpc.RpcRouter([slow.url, fast.url])
+    for _ in range(20):
+        router.health[slow.url].record_success(0.05)
+        router.health[fast.url].record_success(0.1)
+    monkeypatch.setitem(rpc._routers, config.rpc, router)
+    monkeypatch.setitem(rpc._batchers, config.rpc, rpc.RpcBatcher(config.rpc))
+    assert method in rpc.RPC_UNHEDGED_METHODS
+
+    run(rpc.rpc_call(method, params))
+    assert slow.calls == [method]
+    assert fast.calls == []
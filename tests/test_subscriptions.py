@@ -0,0 +1,130 @@
+import asyncio
+import base64
+import time
+
+import pytest
+
+import config
+import rpc
+import subscriptions
+from constants import ACCOUNT_LEN
+from layouts import LIQUIDITY_STATE_LAYOUT_V4
+from quote import pool_state_cache
+from subscriptions import AccountFeed, forget_watched_pools, unwatch, watch_pool
+from tasks import schedule
+from tests.fake_rpc import FakeRpc
+
+WALLET = "9WzDXwBbmkg8ZTbNMqUxvQRAyrZzDsGYdLVL9zYtAWWM"
+PROGRAM = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
+
+
+def run(coro, timeout=10):
+    return schedule(coro).result(timeout)
+
+async def wait_for(condition, timeout=5):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+def account(data, lamports=5):
+    return {"lamports": lamports, "data": [base64.b64encode(data).decode(), "base64"], "owner": PROGRAM}
+
+
+@pytest.fixture
+def fake_rpc():
+    fake = run(FakeRpc().start())
+    yield fake
+    run(fake.stop())
+
+@pytest.fixture
+def feed(fake_rpc):
+    feed = AccountFeed(fake_rpc.ws_url, reconnect_delay=0.05)
+    yield feed
+    run(feed.close())
+
+
+def test_subscribe_and_unsubscribe_bookkeeping(fake_rpc, feed):
+    async def scenario():
+        key = feed.subscribe_account(WALLET, lambda *args: None)
+        await wait_for(lambda: feed.active)
+        subscription_id = fake_rpc.subscription_id("accountSubscribe", WALLET)
+        assert feed.active == {subscription_id: key}
+
+        # an equal subscription shares the slot instead of subscribing again
+        assert feed.subscribe_account(WALLET, lambda *args: None) == key
+        await asyncio.sleep(0.1)
+        assert len(fake_rpc.subscriptions) == 1
+
+        await feed.unsubscribe(key)
+        await wait_for(lambda: fake_rpc.unsubscribed)
+        assert fake_rpc.unsubscribed == [("accountUnsubscribe", subscription_id)]
+        assert feed.subscriptions == {} and feed.active == {}
+
+    run(scenario())
+
+
+def test_notifications_reach_the_callback_of_their_subscription(fake_rpc, feed):
+    received = {"account": [], "program": []}
+
+    async def scenario():
+        feed.subscribe_account(WALLET, lambda *args: received["account"].append(args))
+        feed.subscribe_program(PROGRAM, [{"dataSize": 165}], lambda *args: received["program"].append(args))
+        await wait_for(lambda: len(feed.active) == 2)
+
+        await fake_rpc.push(fake_rpc.subscription_id("accountSubscribe", WALLET), "accountNotification", account(b"wallet", 7))
+        await fake_rpc.push(fake_rpc.subscription_id("programSubscribe", PROGRAM), "programNotification", {"pubkey": "TokenAccount1", "account": account(b"token")})
+        await wait_for(lambda: received["account"] and received["program"])
+
+    run(scenario())
+    assert received == {"account": [(WALLET, 7, b"wallet")], "program": [("TokenAccount1", 5, b"token")]}
+
+
+def test_resubscribes_after_a_reconnect(fake_rpc, feed):
+    received = []
+
+    async def scenario():
+        key = feed.subscribe_account(WALLET, lambda *args: received.append(args))
+        await wait_for(lambda: feed.active)
+        first_id = fake_rpc.subscription_id("accountSubscribe", WALLET)
+
+        await fake_rpc.disconnect()
+        await wait_for(lambda: fake_rpc.subscriptions and feed.active)
+        second_id = fake_rpc.subscription_id("accountSubscribe", WALLET)
+        assert second_id != first_id
+        assert feed.active == {second_id: key}
+
+        await fake_rpc.push(second_id, "accountNotification", account(b"after reconnect"))
+        await wait_for(lambda: received)
+
+    run(scenario())
+    assert received == [(WALLET, 5, b"after reconnect")]
+
+
+def test_watched_pool_reserves_stay_cached_until_unwatched_or_disconnected(fake_rpc, monkeypatch):
+    amm, base_vault, quote_vault = "AmmAccount1", "BaseVault1", "QuoteVault1"
+    pool_keys = {"amm_id": amm, "base_vault": base_vault, "quote_vault": quote_vault}
+    blobs = {amm: bytes(LIQUIDITY_STATE_LAYOUT_V4.sizeof()), base_vault: bytes(ACCOUNT_LEN), quote_vault: bytes(ACCOUNT_LEN)}
+    fake_rpc.handlers["getMultipleAccounts"] = lambda params: {"context": {"slot": 1}, "value": [account(blobs[key]) for key in params[0]]}
+    monkeypatch.setitem(rpc._routers, config.rpc, rpc.RpcRouter([fake_rpc.url]))
+    feed = AccountFeed(fake_rpc.ws_url, reconnect_delay=0.05, on_disconnect=forget_watched_pools)
+    monkeypatch.setitem(subscriptions._feeds, fake_rpc.ws_url, feed)
+    expiry = lambda: pool_state_cache.entries[amm][0] - time.time()
+
+    async def scenario():
+        keys = await watch_pool(pool_keys, endpoint=fake_rpc.ws_url)
+        await wait_for(lambda: len(feed.active) == 3)
+        assert expiry() > config.pool_state_ttl
+
+        await fake_rpc.disconnect()
+        await wait_for(lambda: amm not in pool_state_cache.entries)
+        await wait_for(lambda: len(feed.active) == 3)
+        await fake_rpc.push(fake_rpc.subscription_id("accountSubscribe", base_vault), "accountNotification", account(bytes(ACCOUNT_LEN)))
+        await wait_for(lambda: amm in pool_state_cache.entries)
+        assert expiry() > config.pool_state_ttl
+
+        await unwatch(keys, endpoint=fake_rpc.ws_url)
+        assert amm not in pool_state_cache.entries and amm not in subscriptions._watched_pools
+        await feed.close()
+
+    run(scenario())
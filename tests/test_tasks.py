@@ -0,0 +1,22 @@
+import time
+
+import tasks
+
+
+def test_shutdown_runs_the_session_closers_and_stops_the_loop(monkeypatch):
+    closed = []
+
+    async def close_session():
+        closed.append(True)
+
+    async def broken_close():
+        raise RuntimeError("already gone")
+
+    monkeypatch.setattr(tasks, "shutdown_hooks", [broken_close, close_session])
+    scheduler = tasks.TaskScheduler()
+    scheduler.shutdown(timeout=5)
+    assert closed == [True]
+    deadline = time.monotonic() + 5
+    while not scheduler.loop.is_closed() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert scheduler.loop.is_closed()
@@ -0,0 +1,37 @@
+from types import SimpleNamespace
+
+import pytest
+
+import utils
+
+TOKEN = "4k3Dyjzvzp8eMZWUXbBCjEvwSkkk59S5iCNLY3QrkX6R"
+OTHER = "EKpQGSJtjMFqKZ9KQanSqYXRcF8fBopzLHYxdM65zcjm"
+WSOL = "So11111111111111111111111111111111111111112"
+
+
+@pytest.fixture
+def swap_col():
+    return SimpleNamespace(controls=[None, None, SimpleNamespace(value="0.1"), SimpleNamespace(value="200000"), SimpleNamespace(value="1000")])
+
+@pytest.fixture(autouse=True)
+def wallet(monkeypatch):
+    monkeypatch.setattr(utils, "wallets_map", {"Wallet 1": {"keypair": "keypair"}})
+
+def validated(monkeypatch, mint, decimals=6):
+    monkeypatch.setattr(utils, "global_pool_keys", {"amm_id": "amm", "base_mint": mint, "quote_mint": WSOL})
+    monkeypatch.setattr(utils, "global_decimals", decimals)
+
+
+def test_order_takes_the_pool_of_its_token(monkeypatch, swap_col):
+    validated(monkeypatch, TOKEN)
+    order = utils.create_trade_order("Wallet 1", TOKEN, swap_col)
+    assert order["pool_keys"]["base_mint"] == TOKEN
+    assert order["decimals"] == 6
+    assert (order["amount"], order["compute_unit_limit"], order["compute_unit_price"]) == ("0.1", "200000", "1000")
+
+
+def test_order_drops_the_pool_of_the_previous_token(monkeypatch, swap_col):
+    validated(monkeypatch, OTHER, decimals=9)
+    order = utils.create_trade_order("Wallet 1", TOKEN, swap_col)
+    assert order["pool_keys"] is None
+    assert order["decimals"] is None
@@ -0,0 +1,85 @@
+import asyncio
+from functools import partial
+
+import pytest
+
+import config
+import rpc
+import txns
+from tasks import schedule
+from tests.fake_rpc import FakeRpc
+
+LANDED = {"slot": 1, "confirmations": None, "err": None, "confirmationStatus": "confirmed"}
+FAILED = {"slot": 1, "confirmations": None, "err": {"InstructionError": [0, "Custom"]}, "confirmationStatus": "confirmed"}
+
+
+def run(coro, timeout=10):
+    # rpc sessions, batchers and watchers live on the scheduler loop, same as in the app
+    return schedule(coro).result(timeout)
+
+
+@pytest.fixture
+def fake_rpc(monkeypatch):
+    fake = run(FakeRpc().start())
+    # route the default endpoint to the fake node; subscribe mode is pointed at its websocket per call
+    monkeypatch.setitem(rpc._routers, config.rpc, rpc.RpcRouter([fake.url]))
+    yield fake
+    run(fake.stop())
+
+
+async def land_later(fake, signature, status, delay=0.3):
+    await asyncio.sleep(delay)
+    fake.statuses[signature] = status
+
+
+def test_poll_mode_confirms_once_the_signature_lands(fake_rpc):
+    async def confirm():
+        asyncio.ensure_future(land_later(fake_rpc, "poll-sig", LANDED))
+        return await txns.confirm_txn("poll-sig", mode="poll", timeout=5)
+
+    assert run(confirm()) is True
+    assert "getSignatureStatuses" in fake_rpc.calls
+
+
+def test_poll_mode_reports_a_failed_transaction(fake_rpc):
+    fake_rpc.statuses["failed-sig"] = FAILED
+    assert run(txns.confirm_txn("failed-sig", mode="poll", timeout=5)) is False
+
+
+def test_poll_mode_shares_one_status_call_between_signatures(fake_rpc):
+    fake_rpc.statuses.update({"sig-a": LANDED, "sig-b": LANDED})
+
+    async def confirm_both():
+        return await asyncio.gather(txns.confirm_txn("sig-a", mode="poll", timeout=5), txns.confirm_txn("sig-b", mode="poll", timeout=5))
+
+    assert run(confirm_both()) == [True, True]
+    assert fake_rpc.calls.count("getSignatureStatuses") == 1
+
+
+def test_subscribe_mode_waits_for_the_notification(fake_rpc):
+    fake_rpc.notifications["ws-sig"] = {"err": None}
+    assert run(txns.confirm_txn("ws-sig", mode="subscribe", timeout=5, ws_endpoint=fake_rpc.ws_url)) is True
+
+
+def test_subscribe_mode_catches_signatures_that_landed_before_subscribing(fake_rpc):
+    fake_rpc.statuses["early-sig"] = LANDED
+    assert run(txns.confirm_txn("early-sig", mode="subscribe", timeout=5, ws_endpoint=fake_rpc.ws_url)) is True
+
+
+@pytest.mark.parametrize("mode", ["poll", "subscribe"])
+def test_times_out_when_the_signature_never_lands(fake_rpc, mode):
+    assert run(txns.confirm_txn("lost-sig", mode=mode, timeout=0.5, ws_endpoint=fake_rpc.ws_url)) is None
+
+
+def test_block_height_errors_are_retried_then_raised(fake_rpc):
+    fake_rpc.status = 503
+    with pytest.raises(Exception):
+        run(txns.wait_for_block_height(100, interval=0.05, timeout=0.3))
+    assert fake_rpc.calls.count("getBlockHeight") > 1
+
+
+def test_confirmation_fails_instead_of_hanging_when_rpc_stays_down(fake_rpc, monkeypatch):
+    fake_rpc.status = 503
+    monkeypatch.setattr(txns, "wait_for_block_height", partial(txns.wait_for_block_height, interval=0.05, timeout=0.3))
+    with pytest.raises(Exception):
+        run(txns.confirm_before_expiry("down-sig", 100, "confirmed"), timeout=5)
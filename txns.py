@@ -0,0 +1,207 @@
+from solana.rpc.core import RPCException
+
+from solders.hash import Hash
+
+from config import *
+from rpc import *
+
+import asyncio
+import json
+import logging
+import time
+import websockets
+
+COMMITMENT_LEVELS = {"processed": 0, "confirmed": 1, "finalized": 2}
+MAX_SIGNATURES_PER_POLL = 256
+
+# per endpoint, on the scheduler loop like the rpc clients
+_watchers = {}
+_blockhash_providers = {}
+
+def commitment_reached(status, commitment):
+    # statuses without confirmationStatus/confirmations are already rooted
+    reached = status.get("confirmationStatus") or ("finalized" if status.get("confirmations") is None else "processed")
+    return COMMITMENT_LEVELS[reached] >= COMMITMENT_LEVELS[commitment]
+
+
+class SignatureWatcher:
+    """Resolves every pending signature from one batched getSignatureStatuses poll loop."""
+
+    def __init__(self, endpoint=rpc, poll_interval=confirm_poll_interval):
+        self.endpoint = endpoint
+        self.poll_interval = poll_interval
+        self.waiters = {}
+        self.task = None
+
+    def watch(self, signature, commitment=confirm_commitment):
+        future = asyncio.get_running_loop().create_future()
+        self.waiters.setdefault(str(signature), []).append((commitment, future))
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self.poll())
+        return future
+
+    async def poll(self):
+        while self.waiters:
+            signatures = list(self.waiters)[:MAX_SIGNATURES_PER_POLL]
+            try:
+                statuses = (await rpc_call("getSignatureStatuses", [signatures], endpoint=self.endpoint))["value"]
+            except Exception as e:
+                logging.warning(f"Signature status poll failed: {e}")
+                statuses = []
+            for signature, status in zip(signatures, statuses):
+                if status:
+                    self.resolve(signature, status)
+            for signature in [s for s, waiters in self.waiters.items() if all(future.done() for _, future in waiters)]:
+                del self.waiters[signature]
+            if self.waiters:
+                await asyncio.sleep(self.poll_interval)
+
+    def resolve(self, signature, status):
+        for commitment, future in self.waiters.get(signature, []):
+            if not future.done() and (status["err"] or commitment_reached(status, commitment)):
+                future.set_result(status)
+
+
+def get_watcher(endpoint=rpc):
+    if endpoint not in _watchers:
+        _watchers[endpoint] = SignatureWatcher(endpoint)
+    return _watchers[endpoint]
+
+async def subscribe_signature(signature, commitment=confirm_commitment, endpoint=ws_rpc):
+    """Wait for the signatureSubscribe notification of `signature` and return its status."""
+    async with websockets.connect(endpoint) as websocket:
+        await websocket.send(json.dumps({"jsonrpc": "2.0", "id": 1, "method": "signatureSubscribe", "params": [signature, {"commitment": commitment}]}))
+        ack = json.loads(await websocket.recv())
+        if "error" in ack:
+            raise RPCException(ack["error"])
+
+        # the notification never fires for signatures that landed before we subscribed
+        status = (await rpc_call("getSignatureStatuses", [[signature]]))["value"][0]
+        if status and (status["err"] or commitment_reached(status, commitment)):
+            return status
+
+        while True:
+            message = json.loads(await websocket.recv())
+            if message.get("method") == "signatureNotification":
+                return message["params"]["result"]["value"]
+
+async def confirm_txn(txn_sig, commitment=confirm_commitment, timeout=confirm_timeout, mode=confirm_mode, ws_endpoint=ws_rpc):
+    """Wait until `txn_sig` reaches `commitment`. Returns True if it landed, False if it failed and None on timeout.
+
+    `ws_endpoint` is the websocket subscribe mode listens on."""
+    txn_sig = str(txn_sig)
+    try:
+        if mode == "subscribe":
+            status = await asyncio.wait_for(subscribe_signature(txn_sig, commitment, ws_endpoint), timeout)
+        else:
+            status = await asyncio.wait_for(get_watcher().watch(txn_sig, commitment), timeout)
+    except asyncio.TimeoutError:
+        logging.error(f"Timed out after {timeout}s. Transaction confirmation failed.", extra={"signature": txn_sig})
+        return None
+
+    if status["err"]:
+        logging.error(f"Transaction failed. {status['err']}", extra={"signature": txn_sig})
+        return False
+    logging.info(f"Transaction confirmed ({commitment})", extra={"signature": txn_sig})
+    return True
+
+
+class BlockhashProvider:
+    """Keeps a recent blockhash and its last valid block height refreshed in the background."""
+
+    def __init__(self, endpoint=rpc, commitment=blockhash_commitment, interval=blockhash_refresh_interval):
+        self.endpoint = endpoint
+        self.commitment = commitment
+        self.interval = interval
+        self.blockhash = None
+        self.last_valid_block_height = None
+        self.fetched_at = 0
+        self.task = None
+
+    async def refresh(self):
+        value = (await rpc_call("getLatestBlockhash", [{"commitment": self.commitment}], endpoint=self.endpoint))["value"]
+        self.blockhash = Hash.from_string(value["blockhash"])
+        self.last_valid_block_height = value["lastValidBlockHeight"]
+        self.fetched_at = time.monotonic()
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logging.warning(f"Blockhash refresh failed: {e}")
+
+    async def get(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self.run())
+        if self.blockhash is None or time.monotonic() - self.fetched_at > blockhash_max_age:
+            await self.refresh()
+        return self.blockhash, self.last_valid_block_height
+
+    def invalidate(self):
+        self.blockhash = None
+
+
+def get_blockhash_provider(endpoint=rpc):
+    if endpoint not in _blockhash_providers:
+        _blockhash_providers[endpoint] = BlockhashProvider(endpoint)
+    return _blockhash_providers[endpoint]
+
+async def wait_for_block_height(block_height, interval=2, timeout=confirm_timeout):
+    """Return once the confirmed block height is past `block_height`.
+
+    Failed polls (e.g. a node behind) are retried, never taken as passed; once they have failed for `timeout` seconds
+    in a row the last error is raised."""
+    failing_since = None
+    while True:
+        try:
+            if (await rpc_call("getBlockHeight", [{"commitment": "confirmed"}])) > block_height:
+                return
+            failing_since = None
+        except Exception as e:
+            failing_since = failing_since or time.monotonic()
+            if time.monotonic() - failing_since >= timeout:
+                logging.error(f"Block height unknown for {timeout}s: {e}")
+                raise
+            logging.warning(f"Block height poll failed: {e}")
+        await asyncio.sleep(interval)
+
+async def confirm_before_expiry(txn_sig, last_valid_block_height, commitment=confirm_commitment):
+    """confirm_txn that gives up once the blockhash of `txn_sig` can no longer land (returns None then)."""
+    # no timeout here: giving up while the blockhash is still valid could get the trade landed twice
+    confirm = asyncio.ensure_future(confirm_txn(txn_sig, commitment, timeout=None))
+    expiry = asyncio.ensure_future(wait_for_block_height(last_valid_block_height))
+    await asyncio.wait([confirm, expiry], return_when=asyncio.FIRST_COMPLETED)
+    if confirm.done():
+        expiry.cancel()
+        return confirm.result()
+
+    confirm.cancel()
+    if expiry.exception() is not None:
+        # expiry is unknown, so resending could land the trade twice
+        raise expiry.exception()
+    # it may still have made it into the very last valid block
+    status = (await rpc_call("getSignatureStatuses", [[str(txn_sig)]]))["value"][0]
+    if status:
+        return await confirm_txn(txn_sig, commitment, timeout=None)
+    return None
+
+async def send_and_confirm(build_transaction, commitment=confirm_commitment, max_resends=max_resends):
+    """Sign with the cached blockhash, send, and re-sign/resend with a fresh one if it expires before landing.
+
+    `build_transaction(blockhash)` must return the signed VersionedTransaction. Returns (signature, confirmed)
+    where confirmed follows confirm_txn: True landed, False failed, None gave up."""
+    provider = get_blockhash_provider()
+    txn_sig, confirmed = None, None
+    for attempt in range(max_resends + 1):
+        blockhash, last_valid_block_height = await provider.get()
+        transaction = build_transaction(blockhash)
+        txn_sig = await send_raw_transaction(transaction)
+        logging.info(f"sig: {txn_sig}", extra={"signature": str(txn_sig)})
+        confirmed = await confirm_before_expiry(txn_sig, last_valid_block_height, commitment)
+        if confirmed is not None or attempt == max_resends:
+            break
+        logging.warning(f"Blockhash expired before the transaction landed, re-signing (resend {attempt + 1}/{max_resends})")
+        provider.invalidate()
+    return txn_sig, confirmed
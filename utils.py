@@ -1,4 +1,3 @@
-from solana.rpc.async_api import AsyncClient
 from solana.rpc.types import TokenAccountOpts, MemcmpOpts, TxOpts
 from solana.rpc.commitment import Confirmed, Finalized, Processed
 from solana.transaction import Signature, AccountMeta
@@ -8,6 +7,7 @@ from solders.instruction import Instruction
 from solders.compute_budget import set_compute_unit_limit, set_compute_unit_price
 from solders.transaction import VersionedTransaction
 from solders.message import MessageV0
+from solders.hash import Hash
 from solders.system_program import create_account
 import solders.system_program as system_program
 
@@ -16,12 +16,19 @@ from spl.token.instructions import create_associated_token_account, get_associat
 from config import *
 from constants import *
 from layouts import *
+from decoders import *
 from chart import *
+from rpc import *
+from txns import *
+from pools import *
+from quote import *
+from accounts import *
+from subscriptions import *
+from market import *
 
 import flet as ft
 import asyncio
 import base58
-import aiohttp
 import logging
 import re
 import time
@@ -39,6 +46,14 @@ global_token_balance = None
 
 current_sort_column = None
 sort_ascending = True
+df = None
+
+# holdings dropdown entry showing every wallet of wallets_map combined
+ALL_WALLETS = "All Wallets"
+
+# subscription keys of what the account feed is currently watching for the ui
+live_wallet_keys = []
+live_pool_keys = []
 
 def initialize_wallets_map(wallets_map):
     logging.info(f"Initializing wallets")
@@ -53,83 +68,141 @@ def initialize_wallets_map(wallets_map):
 async def get_balance(public_key):
     logging.info(f"Fetching native balance")
     try:
-        return (await AsyncClient(rpc).get_balance(public_key, commitment="processed")).value / LAMPORTS_PER_SOL
+        return (await rpc_call("getBalance", [str(public_key), {"commitment": "processed"}]))["value"] / LAMPORTS_PER_SOL
     except Exception as e:
         logging.error(f"Error in get_balance: {e}")
         return 'N/A'
 
 async def get_sol_data():
     logging.info("Fetching Sol market data")
-    url = "https://api.geckoterminal.com/api/v2/networks/solana/tokens/So11111111111111111111111111111111111111112"
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            try:
-                data = await response.json()
-                return data['data']['attributes']['price_usd'], data['data']['attributes']['fdv_usd']
-            except Exception as e:
-                logging.error(f"Failed to get_sol_data: {e}")
-                return None, None        
+    try:
+        attrs = (await get_gecko_client().get_tokens([SOL])).get(SOL) or {}
+        return attrs.get('price_usd'), attrs.get('fdv_usd'), attrs.get('image_url')
+    except Exception as e:
+        logging.error(f"Failed to get_sol_data: {e}")
+        return None, None, None
 
+async def get_token_market_data(mints):
+    """Logo, name, symbol, usd price and fdv of each mint GeckoTerminal knows (served from the market data cache while fresh)."""
+    logging.info("Fetching token data")
+    market_data = {}
+    for address, attrs in (await get_gecko_client().get_tokens(mints)).items():
+        if attrs:
+            market_data[address] = {
+                "Logo": attrs['image_url'],
+                'Name': attrs['name'],
+                'Symbol': attrs['symbol'],
+                'PriceUSD': float(attrs['price_usd'] or 0),
+                'FDV': f"$ {millify(attrs['fdv_usd'], precision=2) if attrs['fdv_usd'] else 0}",
+            }
+    return market_data
 
 async def get_token_details(mint_balance_map):
-    logging.info("Fetching token data")
+    market_data = await get_token_market_data(mint_balance_map.keys())
     token_details = []
-    async with aiohttp.ClientSession() as session:
-        for i in range(0, len(mint_balance_map), 30):
-            chunk = list(mint_balance_map.keys())[i:i+30]
-            url = f"https://api.geckoterminal.com/api/v2/networks/solana/tokens/multi/{','.join(chunk)}"
-            try:
-                async with session.get(url) as response:
-                    data = await response.json()
-                    for pair in data.get('data', []):
-                        attrs = pair['attributes']
-                        address = attrs['address']
-                        if address in mint_balance_map:
-                            balance = float(mint_balance_map[address])
-                            token_details.append({
-                                "Logo": attrs['image_url'],
-                                'Mint': address,
-                                'Name': attrs['name'],
-                                'Symbol': attrs['symbol'],
-                                'Balance': millify(balance, precision=2),
-                                'BalanceUSD': float(attrs['price_usd'] or 0) * balance,
-                                'FDV': f"$ {millify(attrs['fdv_usd'], precision=2) if attrs['fdv_usd'] else 0}",
-                            })
-            except Exception as e:
-                logging.error(f"Failed to get_token_details for chunk: {e}")
+    for address, info in market_data.items():
+        if address in mint_balance_map:
+            balance = float(mint_balance_map[address] or 0)
+            token_details.append({
+                "Logo": info['Logo'],
+                'Mint': address,
+                'Name': info['Name'],
+                'Symbol': info['Symbol'],
+                'Balance': millify(balance, precision=2),
+                'BalanceUSD': info['PriceUSD'] * balance,
+                'PriceUSD': info['PriceUSD'],
+                'FDV': info['FDV'],
+            })
     return token_details
 
-async def get_token_accounts_by_owner_json_parsed(keypair):
+async def get_token_balances(keypair):
     logging.info("Fetching token balances")
     try:
-        opts = TokenAccountOpts(program_id=TOKEN_PROGRAM, encoding="jsonParsed")
-        token_accounts_response = await AsyncClient(rpc).get_token_accounts_by_owner_json_parsed(keypair.pubkey(), opts, commitment="processed")
-        return {info['mint']: info['tokenAmount']['uiAmount'] for account in token_accounts_response.value for info in [account.account.data.parsed.get("info")] if info}
+        accounts = await get_token_snapshot(keypair.pubkey())
+        return {mint: entry["amount"] / 10 ** entry["decimals"] if entry["decimals"] is not None else None for mint, entry in accounts.items()}
     except Exception as e:
-        logging.error(f"Error in get_token_accounts_by_owner_json_parsed: {e}")
+        logging.error(f"Error in get_token_balances: {e}")
         raise
 
 async def create_dataframe_for_wallet(selected_wallet):
     try:
         logging.info(f"Updating table for {selected_wallet}")
-        balance = await get_balance(wallets_map[selected_wallet]["keypair"].pubkey())
-        price_usd, fdv = await get_sol_data()
+        keypair = wallets_map[selected_wallet]["keypair"]
+        # balance and token accounts go out in the same rpc batch
+        balance, (price_usd, fdv, logo_url), mint_balance_map = await asyncio.gather(
+            get_balance(keypair.pubkey()),
+            get_sol_data(),
+            get_token_balances(keypair),
+        )
         data = [{
-            "Logo": solana_logo_url,
+            "Logo": logo_url,
             'Mint': "So11111111111111111111111111111111111111112",
             "Name": "Solana",
             "Symbol": "SOL",
             "Balance": millify(balance, precision=4),
             "BalanceUSD": balance * float(price_usd) if price_usd else 0,
+            "PriceUSD": float(price_usd) if price_usd else 0,
             "FDV": f"$ {millify(fdv, precision=2) if fdv else 0}"
         }]
-        mint_balance_map = await get_token_accounts_by_owner_json_parsed(wallets_map[selected_wallet]["keypair"])
         token_details = await get_token_details(mint_balance_map) if mint_balance_map else []
         return pd.DataFrame(data + token_details).sort_values(by='BalanceUSD', ascending=False)
     except Exception as e:
         logging.error(f"Error creating DataFrame for wallet {selected_wallet}: {e}")
         return pd.DataFrame()
 
+async def get_wallet_holdings(wallet_id):
+    """mint -> ui amount for one wallet, native SOL (plus any wrapped SOL) under the SOL mint."""
+    keypair = wallets_map[wallet_id]["keypair"]
+    try:
+        balance, mint_balance_map = await asyncio.gather(get_balance(keypair.pubkey()), get_token_balances(keypair))
+    except Exception as e:
+        logging.error(f"Error fetching holdings of {wallet_id}: {e}")
+        return {}
+    holdings = {mint: amount or 0 for mint, amount in mint_balance_map.items()}
+    holdings[SOL] = holdings.get(SOL, 0) + (balance if balance != 'N/A' else 0)
+    return holdings
+
+async def create_portfolio_dataframe(wallet_ids=None, max_concurrency=portfolio_concurrency):
+    """Holdings of every wallet in one frame: one row per mint with the combined balance, plus a column per wallet with its share.
+
+    Wallets are fetched concurrently (at most `max_concurrency` at a time) and each mint is priced once."""
+    wallet_ids = list(wallet_ids or wallets_map)
+    logging.info(f"Updating portfolio of {len(wallet_ids)} wallets")
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def fetch(wallet_id):
+        async with semaphore:
+            return await get_wallet_holdings(wallet_id)
+
+    try:
+        holdings = dict(zip(wallet_ids, await asyncio.gather(*[fetch(wallet_id) for wallet_id in wallet_ids])))
+        mints = list(dict.fromkeys(mint for wallet_holdings in holdings.values() for mint in wallet_holdings))
+        market_data = await get_token_market_data(mints)
+        rows = []
+        for mint in mints:
+            info = market_data.get(mint)
+            if info is None and mint != SOL:
+                # same as the single wallet table, tokens GeckoTerminal doesn't know are left out
+                continue
+            info = info or {"Logo": None, "Name": "Solana", "Symbol": "SOL", "PriceUSD": 0, "FDV": "$ 0"}
+            amounts = {wallet_id: holdings[wallet_id].get(mint, 0) for wallet_id in wallet_ids}
+            balance = sum(amounts.values())
+            rows.append({
+                "Logo": info['Logo'],
+                'Mint': mint,
+                'Name': info['Name'],
+                'Symbol': info['Symbol'],
+                'Balance': millify(balance, precision=4 if mint == SOL else 2),
+                'BalanceUSD': info['PriceUSD'] * balance,
+                'PriceUSD': info['PriceUSD'],
+                'FDV': info['FDV'],
+                **amounts,
+            })
+        return pd.DataFrame(rows).sort_values(by='BalanceUSD', ascending=False) if rows else pd.DataFrame()
+    except Exception as e:
+        logging.error(f"Error creating portfolio DataFrame: {e}")
+        return pd.DataFrame()
+
 def get_token_names_from_df(df):
     return [ft.dropdown.Option(f'{row["Name"]} ({row["Mint"]})') for _, row in df.iterrows()] if df is not None else []
 
@@ -210,42 +283,143 @@ def header_on_click(e, col_name, data_table, page):
 
     sort_ascending = not sort_ascending if current_sort_column == col_name else True
     current_sort_column = col_name
-    sorted_df = sort_dataframe(df, col_name, sort_ascending)
-    data_table.rows.clear()
-    data_table.rows.extend(create_data_table_from_df(sorted_df))
+    df = sort_dataframe(df, col_name, sort_ascending)
+    render_holdings(data_table)
     page.update()
     return current_sort_column, sort_ascending
 
-def create_data_table_from_df(df):
+# holdings view state: only the current page of the filtered frame is materialized
+holdings_page = 0
+holdings_search = ""
+hide_dust = True
+holdings_page_label = None
+
+# row key -> DataRow currently owned by the holdings table, reused across refreshes and sorts
+holdings_rows = {}
+
+def holdings_keys(df):
+    """Row key per frame row: the mint, with later duplicates (wrapped next to native SOL) numbered in frame order."""
+    occurrence = df.sort_index().groupby('Mint').cumcount().loc[df.index]
+    return [mint if n == 0 else f"{mint}#{n}" for mint, n in zip(df['Mint'], occurrence)]
+
+def holdings_cells(df):
+    """Display values of every row as [logo, name, symbol, balance, usd balance, fdv], built column-wise."""
+    logos = [logo if logo != 'N/A' else None for logo in df['Logo']]
+    usd = [f"${value:.2f}" for value in df['BalanceUSD']]
+    return zip(logos, df['Name'], df['Symbol'], df['Balance'].astype(str), usd, df['FDV'].astype(str))
+
+def create_holdings_row(key, mint):
     def copy_mint(e, mint):
         e.page.set_clipboard(mint)
         e.page.open(show_snackbar("Copied address"))
         logging.info(f'Copied address: {mint}')
 
-    return [ft.DataRow(
-        cells=[
-            ft.DataCell(ft.Image(src=row['Logo'], width=20, height=20) if row['Logo'] else ft.Container()),
-            ft.DataCell(ft.Text(row['Name'], color="#EEEEEE", size=12)),
-            ft.DataCell(ft.Text(row['Symbol'], color="#EEEEEE", size=12)),
-            ft.DataCell(ft.Text(str(row['Balance']), color="#EEEEEE", size=12)),
-            ft.DataCell(ft.Text(f"${row['BalanceUSD']:.2f}", color="#EEEEEE", size=12)),
-            ft.DataCell(ft.Text(str(row['FDV']), color="#EEEEEE", size=12))
-        ],
-        on_select_changed=lambda e, mint=row['Mint']: copy_mint(e, mint)
-    ) for _, row in df.iterrows()]
+    return ft.DataRow(
+        cells=[ft.DataCell(ft.Container())] + [ft.DataCell(ft.Text("", color="#EEEEEE", size=12)) for _ in range(5)],
+        on_select_changed=lambda e: copy_mint(e, mint),
+        data=key,
+    )
+
+def set_holdings_cells(data_row, values):
+    """Write `values` into the row's cells, touching only the ones that changed."""
+    logo, texts = values[0], values[1:]
+    logo_cell = data_row.cells[0]
+    if getattr(logo_cell.content, "src", None) != logo:
+        logo_cell.content = ft.Image(src=logo, width=20, height=20) if logo else ft.Container()
+    for cell, value in zip(data_row.cells[1:], texts):
+        if cell.content.value != value:
+            cell.content.value = value
+
+def sync_data_table(data_table, df):
+    """Diff the table against `df` by row key: changed cells are patched, rows reordered, and only new keys get new controls."""
+    keys = df['Key'] if 'Key' in df else holdings_keys(df)
+    rows = []
+    for key, mint, values in zip(keys, df['Mint'], holdings_cells(df)):
+        data_row = holdings_rows.get(key)
+        if data_row is None:
+            data_row = holdings_rows[key] = create_holdings_row(key, mint)
+        set_holdings_cells(data_row, values)
+        rows.append(data_row)
+    for key in set(holdings_rows) - set(keys):
+        del holdings_rows[key]
+    data_table.rows = rows
+
+def filter_holdings(df, search="", min_usd=None):
+    """Rows matching `search` (symbol/name substring or mint prefix) worth at least `min_usd`; native SOL is never hidden as dust."""
+    mask = pd.Series(True, index=df.index)
+    if min_usd is not None:
+        mask &= (pd.to_numeric(df['BalanceUSD'], errors='coerce').fillna(0) >= min_usd) | (df['Mint'] == SOL)
+    search = search.strip()
+    if search:
+        lowered = search.lower()
+        mask &= (
+            df['Symbol'].astype(str).str.lower().str.contains(lowered, regex=False)
+            | df['Name'].astype(str).str.lower().str.contains(lowered, regex=False)
+            | df['Mint'].str.startswith(search)
+        )
+    return df[mask]
+
+def render_holdings(data_table):
+    """Show the current page of the filtered holdings; rows (and their logos) off the page are never built."""
+    global holdings_page
+    if df is None or df.empty:
+        return
+    visible = filter_holdings(df, holdings_search, dust_threshold_usd if hide_dust else None)
+    pages = max(1, -(-len(visible) // holdings_page_size))
+    holdings_page = max(0, min(holdings_page, pages - 1))
+    start = holdings_page * holdings_page_size
+    sync_data_table(data_table, visible.iloc[start:start + holdings_page_size])
+    if holdings_page_label is not None:
+        end = min(start + holdings_page_size, len(visible))
+        holdings_page_label.value = f"{start + 1 if len(visible) else 0}-{end} of {len(visible)}"
+
+def create_holdings_controls(data_table, page):
+    """Search box, dust toggle and pager for the holdings table; they only re-slice the loaded frame, no rpc."""
+    global holdings_page_label
+    holdings_page_label = ft.Text("", color="#EEEEEE", size=12)
+
+    def rerender():
+        render_holdings(data_table)
+        page.update()
+
+    def on_search(e):
+        global holdings_search, holdings_page
+        holdings_search, holdings_page = e.control.value or "", 0
+        rerender()
+
+    def on_dust(e):
+        global hide_dust, holdings_page
+        hide_dust, holdings_page = e.control.value, 0
+        rerender()
+
+    def on_page(step):
+        global holdings_page
+        holdings_page += step
+        rerender()
+
+    return ft.Row([
+        ft.TextField(hint_text="Search symbol or mint", hint_style=ft.TextStyle(color="#EEEEEE", size=11), width=250, height=40, text_size=12, content_padding=10, bgcolor="black", border_color="#EEEEEE", border_width=1, border_radius=ft.border_radius.all(10), color="#EEEEEE", on_change=on_search),
+        ft.Checkbox(label=f"Hide dust (< ${dust_threshold_usd})", value=hide_dust, on_change=on_dust, label_style=ft.TextStyle(color="#EEEEEE", size=12)),
+        ft.IconButton(ft.icons.CHEVRON_LEFT, icon_color="#EEEEEE", on_click=lambda e: on_page(-1)),
+        holdings_page_label,
+        ft.IconButton(ft.icons.CHEVRON_RIGHT, icon_color="#EEEEEE", on_click=lambda e: on_page(1)),
+    ], spacing=10)
 
 
 async def update_holdings_tab(selected_wallet, data_table, holding_col2, page, spinner):
-    global df
+    global df, holdings_page
     if selected_wallet:
         spinner.visible = True
-        data_table.rows.clear()
-        holding_col2.controls.clear()
         page.update()
 
-        df = await create_dataframe_for_wallet(selected_wallet)
+        df = await (create_portfolio_dataframe() if selected_wallet == ALL_WALLETS else create_dataframe_for_wallet(selected_wallet))
         df = df.fillna('N/A')
-        if not df.empty:
+        holding_col2.controls.clear()
+        if df.empty:
+            data_table.rows = []
+            holdings_rows.clear()
+        else:
+            df['Key'] = holdings_keys(df)
             data_table.columns = [ft.DataColumn(
                                     ft.GestureDetector(
                                         content=ft.Text(column),
@@ -254,8 +428,9 @@ async def update_holdings_tab(selected_wallet, data_table, holding_col2, page, s
                                     on_sort=lambda e, col=column: header_on_click(e, col, data_table, page),
                                 ) for column in ["Logo", "Name", "Symbol", "Balance", "BalanceUSD", "FDV"]]
 
-            data_table.rows.extend(create_data_table_from_df(df)) 
-            piechart = holdings_chart(df)
+            holdings_page = 0
+            render_holdings(data_table)
+            piechart = holdings_chart(filter_holdings(df, min_usd=dust_threshold_usd if hide_dust else None))
             
             new_chart_container = ft.Row([
                 ft.Container(
@@ -275,24 +450,67 @@ async def update_holdings_tab(selected_wallet, data_table, holding_col2, page, s
         spinner.visible = False
         page.update()
 
-async def update_swap_tab(selected_wallet, swap_col2, page, spinner, token, pool):
-    global token_df
-    logging.info(f"Checking wallet")
-    if selected_wallet:
-        spinner.visible = True
-        swap_col2.controls.clear()
-        page.update()
+def apply_live_balance(data_table, key, balance):
+    """Patch the Balance/BalanceUSD cells of the row keyed `key` in place instead of rebuilding the table."""
+    global df
+    if df is None or df.empty or 'Key' not in df or balance is None:
+        return
+    rows = df['Key'] == key
+    if not rows.any():
+        # a token we have no metadata for yet, it shows up with the next reload
+        return
+    price = df.loc[rows, 'PriceUSD'].iloc[0]
+    balance_usd = balance * price if price != 'N/A' else 0
+    balance_text = millify(balance, precision=4 if key == SOL else 2)
+    df.loc[rows, 'Balance'], df.loc[rows, 'BalanceUSD'] = balance_text, balance_usd
+    data_row = holdings_rows.get(key)
+    if data_row is not None:
+        data_row.cells[3].content.value = balance_text
+        data_row.cells[4].content.value = f"${balance_usd:.2f}"
+    try:
+        data_table.update()
+    except Exception as e:
+        logging.warning(f"Could not push live balance for {key}: {e}")
 
-        token_df, chart_name = await get_ohlc(token, pool)
-        logging.info(f"Fetched chart data")
-        if token_df is not pd.DataFrame():
-            token_df = token_df.fillna('N/A')
-        if not token_df.empty:
-            logging.info(f"Plotting chart")
-            await plot_tokenline_chart(token_df, chart_name, swap_col2, page)
-                       
-        spinner.visible = False
-        page.update()
+def watch_holdings(selected_wallet, data_table, token_input_box, token_balance_text):
+    """Follow the selected wallet over the account feed, pushing balance changes into the holdings table and swap tab."""
+    owner = wallets_map[selected_wallet]["pubkey"]
+
+    def on_update(kind, key, value):
+        if kind == "sol":
+            apply_live_balance(data_table, SOL, value)
+            return
+        balance = value["amount"] / 10 ** value["decimals"] if value and value["decimals"] is not None else 0
+        if key != SOL:
+            # a wrapped sol account must not overwrite the native balance row
+            apply_live_balance(data_table, key, balance)
+        if key == token_input_box.value:
+            token_balance_text.value = f"{balance}" if balance else "0"
+            token_balance_text.update()
+
+    async def switch():
+        global live_wallet_keys
+        await unwatch(live_wallet_keys)
+        live_wallet_keys = await watch_wallet(owner, on_update)
+
+    run_in_feed_loop(switch())
+
+def unwatch_holdings():
+    async def stop():
+        global live_wallet_keys
+        await unwatch(live_wallet_keys)
+        live_wallet_keys = []
+
+    run_in_feed_loop(stop())
+
+def watch_swap_pool(pool_keys):
+    """Keep the reserves of the pool on the swap tab pushed into the quote cache."""
+    async def switch():
+        global live_pool_keys
+        await unwatch(live_pool_keys)
+        live_pool_keys = await watch_pool(pool_keys)
+
+    run_in_feed_loop(switch())
 
 def is_valid_solana_address(address):
     if not re.match(r'^[1-9A-HJ-NP-Za-km-z]{32,44}$', address):
@@ -303,141 +521,181 @@ def is_valid_solana_address(address):
     except ValueError:
         return False
     
-async def get_token_account_info_from_rpc(keypair, mint):
+async def get_token_account_info(keypair, mint, refresh=False):
+    """(token_account, ui balance, raw balance, decimals) from the wallet snapshot; `refresh` re-reads that account first."""
     try:
-        opts = TokenAccountOpts(mint=Pubkey.from_string(mint), encoding="jsonParsed")
-        token_accounts_response = await AsyncClient(rpc).get_token_accounts_by_owner_json_parsed(keypair.pubkey(), opts)
-        accounts = token_accounts_response.value
-        if accounts:
-            token_account = accounts[0].pubkey
-            parsed_data = accounts[0].account.data.parsed
-            if "info" in parsed_data:
-                info = parsed_data["info"]
-                token_amount = info.get("tokenAmount", {})
-                return token_account, token_amount.get("uiAmount"), token_amount.get("amount"), token_amount.get("decimals")
+        if refresh:
+            await refresh_token_accounts(keypair.pubkey(), [mint])
+        entry = (await get_token_snapshot(keypair.pubkey())).get(str(mint))
+        if entry:
+            decimals = entry["decimals"]
+            balance = entry["amount"] / 10 ** decimals if decimals is not None else None
+            return Pubkey.from_string(entry["account"]), balance, str(entry["amount"]), decimals
         return None, None, None, None
     except Exception as e:
-        logging.error(f"Error in get_token_account_info_from_rpc: {e}")
+        logging.error(f"Error in get_token_account_info: {e}")
         raise
 
+async def fetch_rent_exemption(size):
+    return await rpc_call("getMinimumBalanceForRentExemption", [size])
+
 async def enable_controls(swap_col):
     swap_col.controls[2].read_only = False
     swap_col.controls[2].disabled = False            
     swap_col.update()
         
-async def validate_address(token_input_box, warning_text, token_balance_text, selected_wallet, swap_col):
-    global global_pool_keys, global_decimals, global_pair_address
-    address = token_input_box.value
-    if selected_wallet:
-        keypair = wallets_map[selected_wallet]["keypair"]
-        if is_valid_solana_address(address):
-            await enable_controls(swap_col)
-            warning_text.value, warning_text.color = "Valid Solana Address", "#14F195"
-            warning_text.update()
-            token_account, balance, balance_lamports, decimals = await get_token_account_info_from_rpc(keypair, address)
-            token_balance_text.value = f"{balance}" if balance else "0"
-            try:
-                pair_address = await get_pair_address_from_rpc(str(address))
-                if pair_address:         
-                    pool_keys = await fetch_pool_keys(str(pair_address))
-                    token_balance_text.update()
-                    decimals = pool_keys['base_decimals'] if address == str(pool_keys['base_mint']) else pool_keys['quote_decimals'] if address == str(pool_keys['quote_mint']) else None
-                    warning_text.value = ""
-                    warning_text.update()
-                    global_token_balance, global_pool_keys, global_decimals, global_pair_address = balance, pool_keys, decimals, pair_address
-                return pair_address
-            except Exception as e:
-                logging.error(f"Error: {e}")
+def check_token_input(address, selected_wallet):
+    """Local checks run on every keystroke before anything touches the network: the warning to show, or None if it is worth a lookup."""
+    if not address:
+        return ""
+    if selected_wallet not in wallets_map:
+        return "Please select a wallet first!"
+    if not is_valid_solana_address(address):
+        return "Invalid Solana Address!"
+    return None
+
+async def validate_token(address, selected_wallet, warning_text, token_balance_text, swap_col, swap_col2, page, spinner, debounce=token_validation_debounce):
+    """Debounced lookup behind the token box; run it under one scheduler key so the next keystroke cancels it.
+
+    The balance lookup runs alongside the pool lookup, and the pool keys and chart candles are fetched together once the pair is known."""
+    global global_pool_keys, global_decimals, global_pair_address, global_token_balance, token_df
+    # the previous token's pool must not outlive its address in the token box
+    global_pool_keys, global_decimals, global_pair_address, global_token_balance = None, None, None, None
+    await asyncio.sleep(debounce)
+    logging.info(f"validating token")
+    keypair = wallets_map[selected_wallet]["keypair"]
+    spinner.visible = True
+    warning_text.value, warning_text.color = "Valid Solana Address", "#14F195"
+    swap_col2.controls.clear()
+    await enable_controls(swap_col)
+    page.update()
+
+    async def balance_lookup():
+        try:
+            return (await get_token_account_info(keypair, address))[1]
+        except Exception as e:
+            logging.error(f"Error: {e}")
+            return None
+
+    async def pool_lookup():
+        try:
+            pair_address = await get_pair_address_from_rpc(address)
+            if not pair_address:
+                return None, None, (pd.DataFrame(), None)
+            pool_keys, ohlc = await asyncio.gather(fetch_pool_keys(str(pair_address)), get_ohlc(address, pair_address))
+            return pair_address, pool_keys, ohlc
+        except Exception as e:
+            logging.error(f"Error: {e}")
+            return None, None, (pd.DataFrame(), None)
+
+    try:
+        balance, (pair_address, pool_keys, (token_df, chart_name)) = await asyncio.gather(balance_lookup(), pool_lookup())
+        token_balance_text.value = f"{balance}" if balance else "0"
+        token_balance_text.update()
+        if pool_keys:
+            decimals = pool_keys['base_decimals'] if address == str(pool_keys['base_mint']) else pool_keys['quote_decimals'] if address == str(pool_keys['quote_mint']) else None
+            global_token_balance, global_pool_keys, global_decimals, global_pair_address = balance, pool_keys, decimals, pair_address
+            watch_swap_pool(pool_keys)
+            warning_text.value = ""
         else:
-            warning_text.value, warning_text.color = "Invalid Solana Address!", "RED"
-    else:
-        warning_text.value = "Please select a wallet first!"
-    warning_text.update()
-    await asyncio.sleep(5)
-    warning_text.value = ""
-    warning_text.update()
-    
+            global_pool_keys, global_decimals, global_pair_address = None, None, None
+            warning_text.value, warning_text.color = "No Raydium pool found", "#FF8F00"
+        warning_text.update()
+        if not token_df.empty:
+            logging.info(f"Plotting chart")
+            await plot_tokenline_chart(token_df, chart_name, swap_col2, page)
+    finally:
+        spinner.visible = False
+        page.update()
+    return pair_address
+
 async def get_pair_address_from_rpc(token_address: str) -> str:
-    BASE_OFFSET, QUOTE_OFFSET, DATA_LENGTH_FILTER = 400, 432, 752
     QUOTE_MINT = SOL
+    pair_address = lookup_pair_address(token_address, QUOTE_MINT)
+    if pair_address:
+        return pair_address
 
+    # index miss, most likely a brand new pool: scan for it and remember the result
     try:
-        #base_mint at BASE_OFFSET, QUOTE_MINT at QUOTE_OFFSET
-        filters = [DATA_LENGTH_FILTER, MemcmpOpts(offset=BASE_OFFSET, bytes=bytes(Pubkey.from_string(token_address))), MemcmpOpts(offset=QUOTE_OFFSET,bytes=bytes(Pubkey.from_string(QUOTE_MINT)))]
-        response = await AsyncClient(rpc).get_program_accounts(pubkey=RAY_V4, commitment=Confirmed, filters=filters, encoding="jsonParsed")
-        if response.value:
-            return str(response.value[0].pubkey)
-
-        #QUOTE_MINT at BASE_OFFSET, base_mint at QUOTE_OFFSET
-        filters = [DATA_LENGTH_FILTER, MemcmpOpts(offset=BASE_OFFSET, bytes=bytes(Pubkey.from_string(QUOTE_MINT))), MemcmpOpts(offset=QUOTE_OFFSET, bytes=bytes(Pubkey.from_string(token_address)))]
-        response = await AsyncClient(rpc).get_program_accounts(pubkey=RAY_V4, commitment=Confirmed, filters=filters, encoding="jsonParsed")
-        if response.value:
-            return str(response.value[0].pubkey)
-        
+        #base_mint at BASE_OFFSET, QUOTE_MINT at QUOTE_OFFSET / QUOTE_MINT at BASE_OFFSET, base_mint at QUOTE_OFFSET
+        as_base, as_quote = await asyncio.gather(scan_pools(token_address, QUOTE_MINT), scan_pools(QUOTE_MINT, token_address))
+        pools = as_base + as_quote
+        if pools:
+            add_pools(pools)
+            return pools[0][0]
     except Exception as e:
         logging.error(f"Error fetching pair_address_from_rpc: {e}")
     return None
 
-async def fetch_pool_keys(pair_address: str) -> dict:
+def build_pool_keys(amm_id, amm_data_decoded, market_decoded):
+    OPEN_BOOK_PROGRAM = Pubkey.from_bytes(amm_data_decoded.serumProgramId)
+    marketId = Pubkey.from_bytes(amm_data_decoded.serumMarket)
+    return {
+        "amm_id": amm_id,
+        "base_mint": Pubkey.from_bytes(market_decoded.base_mint),
+        "quote_mint": Pubkey.from_bytes(market_decoded.quote_mint),
+        "lp_mint": Pubkey.from_bytes(amm_data_decoded.lpMintAddress),
+        "version": 4,
+        "base_decimals": amm_data_decoded.coinDecimals,
+        "quote_decimals": amm_data_decoded.pcDecimals,
+        "lpDecimals": amm_data_decoded.coinDecimals,
+        "programId": RAY_V4,
+        "authority": RAY_AUTHORITY_V4,
+        "open_orders": Pubkey.from_bytes(amm_data_decoded.ammOpenOrders),
+        "target_orders": Pubkey.from_bytes(amm_data_decoded.ammTargetOrders),
+        "base_vault": Pubkey.from_bytes(amm_data_decoded.poolCoinTokenAccount),
+        "quote_vault": Pubkey.from_bytes(amm_data_decoded.poolPcTokenAccount),
+        "withdrawQueue": Pubkey.from_bytes(amm_data_decoded.poolWithdrawQueue),
+        "lpVault": Pubkey.from_bytes(amm_data_decoded.poolTempLpTokenAccount),
+        "marketProgramId": OPEN_BOOK_PROGRAM,
+        "market_id": marketId,
+        "market_authority": Pubkey.create_program_address(
+            [bytes(marketId)]
+            + [bytes([market_decoded.vault_signer_nonce])]
+            + [bytes(7)],
+            OPEN_BOOK_PROGRAM,
+        ),
+        "market_base_vault": Pubkey.from_bytes(market_decoded.base_vault),
+        "market_quote_vault": Pubkey.from_bytes(market_decoded.quote_vault),
+        "bids": Pubkey.from_bytes(market_decoded.bids),
+        "asks": Pubkey.from_bytes(market_decoded.asks),
+        "event_queue": Pubkey.from_bytes(market_decoded.event_queue),
+        "pool_open_time": amm_data_decoded.poolOpenTime
+    }
+
+async def fetch_many_pool_keys(pair_addresses) -> dict:
+    """Pool keys for every pair address (None where it can't be resolved) in two getMultipleAccounts round trips, whatever the count."""
+    pool_keys_map = {str(pair_address): pool_keys_cache.get(str(pair_address)) for pair_address in pair_addresses}
+    missing = [pair_address for pair_address, pool_keys in pool_keys_map.items() if pool_keys is None]
+    if not missing:
+        return pool_keys_map
     try:
-        async with AsyncClient(rpc) as client:
-            amm_id = Pubkey.from_string(pair_address)
-            amm_data_response = await client.get_account_info(amm_id, encoding="jsonParsed")
-            amm_data = amm_data_response.value.data
-            amm_data_decoded = LIQUIDITY_STATE_LAYOUT_V4.parse(amm_data)
-            OPEN_BOOK_PROGRAM = Pubkey.from_bytes(amm_data_decoded.serumProgramId)
-            marketId = Pubkey.from_bytes(amm_data_decoded.serumMarket)
-            market_info_response = await client.get_account_info(marketId, encoding="jsonParsed")
-            marketInfo = market_info_response.value.data
-            market_decoded = MARKET_STATE_LAYOUT_V3.parse(marketInfo)
-
-            return {
-                "amm_id": amm_id,
-                "base_mint": Pubkey.from_bytes(market_decoded.base_mint),
-                "quote_mint": Pubkey.from_bytes(market_decoded.quote_mint),
-                "lp_mint": Pubkey.from_bytes(amm_data_decoded.lpMintAddress),
-                "version": 4,
-                "base_decimals": amm_data_decoded.coinDecimals,
-                "quote_decimals": amm_data_decoded.pcDecimals,
-                "lpDecimals": amm_data_decoded.coinDecimals,
-                "programId": RAY_V4,
-                "authority": RAY_AUTHORITY_V4,
-                "open_orders": Pubkey.from_bytes(amm_data_decoded.ammOpenOrders),
-                "target_orders": Pubkey.from_bytes(amm_data_decoded.ammTargetOrders),
-                "base_vault": Pubkey.from_bytes(amm_data_decoded.poolCoinTokenAccount),
-                "quote_vault": Pubkey.from_bytes(amm_data_decoded.poolPcTokenAccount),
-                "withdrawQueue": Pubkey.from_bytes(amm_data_decoded.poolWithdrawQueue),
-                "lpVault": Pubkey.from_bytes(amm_data_decoded.poolTempLpTokenAccount),
-                "marketProgramId": OPEN_BOOK_PROGRAM,
-                "market_id": marketId,
-                "market_authority": Pubkey.create_program_address(
-                    [bytes(marketId)]
-                    + [bytes([market_decoded.vault_signer_nonce])]
-                    + [bytes(7)],
-                    OPEN_BOOK_PROGRAM,
-                ),
-                "market_base_vault": Pubkey.from_bytes(market_decoded.base_vault),
-                "market_quote_vault": Pubkey.from_bytes(market_decoded.quote_vault),
-                "bids": Pubkey.from_bytes(market_decoded.bids),
-                "asks": Pubkey.from_bytes(market_decoded.asks),
-                "event_queue": Pubkey.from_bytes(market_decoded.event_queue),
-                "pool_open_time": amm_data_decoded.poolOpenTime
-            }
+        amm_datas = await get_multiple_accounts(missing)
+        amms = {
+            pair_address: LIQUIDITY_STATE_DECODER_V4.parse(amm_data)
+            for pair_address, amm_data in zip(missing, amm_datas)
+            if amm_data and len(amm_data) >= LIQUIDITY_STATE_DECODER_V4.size
+        }
+        market_ids = [Pubkey.from_bytes(amm_data_decoded.serumMarket) for amm_data_decoded in amms.values()]
+        market_datas = await get_multiple_accounts(market_ids)
 
+        fetched = []
+        for (pair_address, amm_data_decoded), market_data in zip(amms.items(), market_datas):
+            if not market_data:
+                logging.error(f"Market account missing for pool {pair_address}")
+                continue
+            pool_keys_map[pair_address] = build_pool_keys(Pubkey.from_string(pair_address), amm_data_decoded, MARKET_STATE_DECODER_V3.parse(market_data))
+            fetched.append(pool_keys_map[pair_address])
+        if fetched:
+            cache_pool_keys(fetched)
     except Exception as e:
         logging.error(f"An error occurred: {e}")
-        return None
-
-def get_token_account(owner: Pubkey, mint: Pubkey):
-    try:
-        account_data = client.get_token_accounts_by_owner(owner, TokenAccountOpts(mint))
-        return account_data.value[0].pubkey, None
-    except:
-        token_account = get_associated_token_address(owner, mint)
-        return token_account, create_associated_token_account(owner, owner, mint)
+    return pool_keys_map
 
+async def fetch_pool_keys(pair_address: str) -> dict:
+    return (await fetch_many_pool_keys([pair_address]))[str(pair_address)]
 
-async def make_swap_instruction(amount_in: int, token_account_in: Pubkey, token_account_out: Pubkey, accounts: dict, owner: Pubkey) -> Instruction:
+async def make_swap_instruction(amount_in: int, token_account_in: Pubkey, token_account_out: Pubkey, accounts: dict, owner: Pubkey, min_amount_out: int = 0) -> Instruction:
     try:
         keys = [
             AccountMeta(pubkey=TOKEN_PROGRAM, is_signer=False, is_writable=False),
@@ -464,45 +722,46 @@ async def make_swap_instruction(amount_in: int, token_account_in: Pubkey, token_
             dict(
                 instruction=9,
                 amount_in=int(amount_in),
-                min_amount_out=0
+                min_amount_out=int(min_amount_out)
             )
         )
         return Instruction(RAY_V4, data, keys)
     except:
         return None
 
-def confirm_txn(txn_sig, max_retries=20, retry_interval=3):
-    retries = 0
-    txn_sig = Signature.from_string(txn_sig) if isinstance(txn_sig, str) else txn_sig
-    for _ in range(max_retries):
-        try:
-            txn_res = client.get_transaction(txn_sig, encoding="json", commitment="confirmed", max_supported_transaction_version=0)
-            txn_json = json.loads(txn_res.value.transaction.meta.to_json())
-            if txn_json['err'] is None:
-                logging.info(f"Transaction confirmed... try count: {retries+1}")
-                return True
-            logging.error("Error: Transaction not confirmed. Retrying...")
-            if txn_json['err']:
-                logging.error(f"Transaction failed. {txn_json['err']}")
-                return False
-        except Exception:
-            logging.warning(f"Awaiting confirmation... try count: {retries+1}")
-            retries += 1
-            time.sleep(retry_interval)
-    logging.error("Max retries reached. Transaction confirmation failed.")
-    return None
+def create_trade_order(selected_wallet, token_address, swap_col):
+    """Everything a trade reads from the ui, taken when its button is clicked: the task may only start after the wallet's earlier trades."""
+    pool_keys, decimals = global_pool_keys, global_decimals
+    if pool_keys is not None and token_address not in (str(pool_keys['base_mint']), str(pool_keys['quote_mint'])):
+        # the token box changed and its validation hasn't finished: never trade it through the previous token's pool
+        logging.warning(f"Pool {pool_keys['amm_id']} is not a pool of {token_address}, order has no pool")
+        pool_keys, decimals = None, None
+    return {
+        "wallet": selected_wallet,
+        "payer_keypair": wallets_map[selected_wallet]["keypair"],
+        "token_address": token_address,
+        "amount": swap_col.controls[2].value,
+        "compute_unit_limit": swap_col.controls[3].value,
+        "compute_unit_price": swap_col.controls[4].value,
+        "pool_keys": pool_keys,
+        "decimals": decimals,
+    }
 
-async def raydium_buy(token_address, payer_keypair, swap_col, warning_text, token_balance_text, page):
-    global global_pool_keys, global_decimals, global_pair_address
-    pool_keys = global_pool_keys    
-    amount_text_field = swap_col.controls[2]
-    compute_unit_limit_text_field = swap_col.controls[3]
-    compute_unit_price_text_field = swap_col.controls[4]
-    
-    if not amount_text_field.value or float(amount_text_field.value) == 0:
+def compute_budget_instructions(order):
+    instructions = []
+    if order["compute_unit_limit"] and int(order["compute_unit_limit"]) != 0:
+        instructions.append(set_compute_unit_limit(int(order["compute_unit_limit"])))
+    if order["compute_unit_price"] and float(order["compute_unit_price"]) != 0:
+        instructions.append(set_compute_unit_price(int(order["compute_unit_price"])))
+    return instructions
+
+async def raydium_buy(order, warning_text, token_balance_text, page):
+    token_address, payer_keypair, pool_keys = order["token_address"], order["payer_keypair"], order["pool_keys"]
+
+    if not order["amount"] or float(order["amount"]) == 0:
         warning_text.value, warning_text.color = "Please enter a valid amount", "RED"
         warning_text.update()
-        token_account, balance, balance_lamports, decimals = await get_token_account_info_from_rpc(payer_keypair, token_address)
+        token_account, balance, balance_lamports, decimals = await get_token_account_info(payer_keypair, token_address)
         token_balance_text.value = f"{balance}" if balance else "0"
         token_balance_text.update()
         await asyncio.sleep(5)
@@ -515,11 +774,20 @@ async def raydium_buy(token_address, payer_keypair, swap_col, warning_text, toke
     try:
         if pool_keys is None:
             logging.error("No pools keys found")
+            warning_text.value, warning_text.color = "No Raydium pool found", "#FF8F00"
+            warning_text.update()
             return None
         
-        amount_in = int(float(amount_text_field.value) * LAMPORTS_PER_SOL)       
-        token_account, token_account_instructions = get_token_account(payer_keypair.pubkey(), Pubkey.from_string(token_address))
-        balance_needed = (await AsyncClient(rpc).get_minimum_balance_for_rent_exemption(ACCOUNT_LAYOUT.sizeof())).value
+        amount_in = int(float(order["amount"]) * LAMPORTS_PER_SOL)
+        (token_account, token_account_instructions), balance_needed, min_amount_out = await asyncio.gather(
+            get_token_account(payer_keypair.pubkey(), Pubkey.from_string(token_address)),
+            fetch_rent_exemption(ACCOUNT_LAYOUT.sizeof()),
+            get_min_amount_out(pool_keys, amount_in, WSOL),
+        )
+        if min_amount_out is None:
+            warning_text.value, warning_text.color = "Could not quote the swap, not sent", "RED"
+            warning_text.update()
+            return
                 
         wsol_account_keypair = Keypair()
         wsol_token_account = wsol_account_keypair.pubkey()  
@@ -542,32 +810,30 @@ async def raydium_buy(token_address, payer_keypair, swap_col, warning_text, toke
         
         if token_account_instructions:
             instructions.append(token_account_instructions)
-        instructions.append(await make_swap_instruction(amount_in, wsol_token_account, token_account, pool_keys, payer_keypair))
+        instructions.append(await make_swap_instruction(amount_in, wsol_token_account, token_account, pool_keys, payer_keypair, min_amount_out))
         instructions.append(close_account(CloseAccountParams(TOKEN_PROGRAM, wsol_token_account, payer_keypair.pubkey(), payer_keypair.pubkey())))
-                
-        if compute_unit_limit_text_field.value and int(compute_unit_limit_text_field.value) != 0:
-            instructions.append(set_compute_unit_limit(int(compute_unit_limit_text_field.value)))
-        
-        if compute_unit_price_text_field.value and float(compute_unit_price_text_field.value) != 0:
-            instructions.append(set_compute_unit_price(int(compute_unit_price_text_field.value)))
-        
-        blockhash = await AsyncClient(rpc).get_latest_blockhash()
-        transaction = VersionedTransaction(
-            MessageV0.try_compile(payer_keypair.pubkey(), instructions, [], blockhash.value.blockhash),
+        instructions += compute_budget_instructions(order)
+
+        txn_sig, confirmed = await send_and_confirm(lambda blockhash: VersionedTransaction(
+            MessageV0.try_compile(payer_keypair.pubkey(), instructions, [], blockhash),
             [payer_keypair, wsol_account_keypair]
-        )
-        txn = await AsyncClient(rpc).send_transaction(transaction, opts=TxOpts(skip_preflight=True, preflight_commitment="processed"))
-        logging.info(f"sig: {txn.value}")
-        if confirm_txn(txn.value):
-            logging.info(f'Transaction landed: https://solscan.io/tx/{txn.value}')
-            page.open(show_confirm_snackbar(txn.value))
+        ))
+        if confirmed:
+            logging.info(f'Transaction landed: {txn_sig}', extra={"signature": str(txn_sig), "mint": token_address})
+            page.open(show_confirm_snackbar(txn_sig))
+            if token_account_instructions:
+                remember_token_account(payer_keypair.pubkey(), token_address, token_account)
         else:
-            logging.error('Couldnt confirm transaction')
+            logging.error('Couldnt confirm transaction', extra={"signature": str(txn_sig), "mint": token_address})
+            if confirmed is False:
+                # a swap that failed on-chain usually means stale cached pool keys or a token account closed behind our back
+                invalidate_pool_keys(pool_keys["amm_id"])
+                forget_token_account(payer_keypair.pubkey(), token_address)
 
         warning_text.value = "Processed txn"
         warning_text.update()
         await asyncio.sleep(5)
-        token_account, balance, balance_lamports, decimals = await get_token_account_info_from_rpc(payer_keypair, token_address)
+        token_account, balance, balance_lamports, decimals = await get_token_account_info(payer_keypair, token_address, refresh=True)
         token_balance_text.value = f"{balance}" if balance else "0"
         token_balance_text.update()
         await asyncio.sleep(5)
@@ -576,14 +842,10 @@ async def raydium_buy(token_address, payer_keypair, swap_col, warning_text, toke
     except Exception as e:
         logging.error(e)
 
-async def raydium_sell(token_address, payer_keypair, swap_col, warning_text, token_balance_text, page):
-    global global_pool_keys, global_decimals, global_pair_address
-    pool_keys, decimals = global_pool_keys, global_decimals
-    amount_text_field = swap_col.controls[2]
-    compute_unit_limit_text_field = swap_col.controls[3]
-    compute_unit_price_text_field = swap_col.controls[4]
-    
-    if not amount_text_field.value or float(amount_text_field.value) == 0:
+async def raydium_sell(order, warning_text, token_balance_text, page):
+    token_address, payer_keypair, pool_keys, decimals = order["token_address"], order["payer_keypair"], order["pool_keys"], order["decimals"]
+
+    if not order["amount"] or float(order["amount"]) == 0:
         warning_text.value = "Please enter a valid amount"
         warning_text.color = "RED"
         warning_text.update()
@@ -598,48 +860,56 @@ async def raydium_sell(token_address, payer_keypair, swap_col, warning_text, tok
     try:
         if pool_keys is None:
             logging.error("No pools keys found")
+            warning_text.value, warning_text.color = "No Raydium pool found", "#FF8F00"
+            warning_text.update()
             return None
         
         if decimals is None:
             logging.error("No decimals found")
             return None
         
-        token_account, balance, balance_lamports, decimals = await get_token_account_info_from_rpc(payer_keypair, token_address)
+        amount_in = int(float(order["amount"]) * (10**decimals))
+        (token_account, balance, balance_lamports, decimals), (wsol_token_account, wsol_token_account_instructions), min_amount_out = await asyncio.gather(
+            get_token_account_info(payer_keypair, token_address, refresh=True),
+            get_token_account(payer_keypair.pubkey(), WSOL),
+            get_min_amount_out(pool_keys, amount_in, token_address),
+        )
+        if min_amount_out is None:
+            warning_text.value, warning_text.color = "Could not quote the swap, not sent", "RED"
+            warning_text.update()
+            return
         balance_lamports = int(balance_lamports)
-        amount_in = int(float(amount_text_field.value) * (10**decimals))  
-        wsol_token_account, wsol_token_account_instructions = get_token_account(payer_keypair.pubkey(), WSOL)
                     
-        swap_instructions = await make_swap_instruction(amount_in, token_account, wsol_token_account, pool_keys, payer_keypair)        
+        swap_instructions = await make_swap_instruction(amount_in, token_account, wsol_token_account, pool_keys, payer_keypair, min_amount_out)        
         close_account_instructions = close_account(CloseAccountParams(TOKEN_PROGRAM, token_account, payer_keypair.pubkey(), payer_keypair.pubkey())) if amount_in == balance_lamports else None
         instructions = []
         if wsol_token_account_instructions:
             instructions.append(wsol_token_account_instructions)
         instructions.append(swap_instructions)
         if close_account_instructions:
-            instructions.append(close_account_instructions)  
-         
-        if compute_unit_limit_text_field.value and int(compute_unit_limit_text_field.value) != 0:
-            instructions.append(set_compute_unit_limit(int(compute_unit_limit_text_field.value)))
-        
-        if compute_unit_price_text_field.value and float(compute_unit_price_text_field.value) != 0:
-            instructions.append(set_compute_unit_price(int(compute_unit_price_text_field.value)))     
-        blockhash = await AsyncClient(rpc).get_latest_blockhash()
-        transaction = VersionedTransaction(
-            MessageV0.try_compile(payer_keypair.pubkey(), instructions, [], blockhash.value.blockhash),
+            instructions.append(close_account_instructions)
+        instructions += compute_budget_instructions(order)
+        txn_sig, confirmed = await send_and_confirm(lambda blockhash: VersionedTransaction(
+            MessageV0.try_compile(payer_keypair.pubkey(), instructions, [], blockhash),
             [payer_keypair]
-        )
-        txn = await AsyncClient(rpc).send_transaction(transaction, opts=TxOpts(skip_preflight=True, preflight_commitment="processed"))
-        logging.info(f"sig: {txn.value}")
-        if confirm_txn(txn.value):
-            logging.info(f'Transaction landed: https://solscan.io/tx/{txn.value}')
-            page.open(page.open(show_confirm_snackbar(txn.value)))
+        ))
+        if confirmed:
+            logging.info(f'Transaction landed: {txn_sig}', extra={"signature": str(txn_sig), "mint": token_address})
+            page.open(page.open(show_confirm_snackbar(txn_sig)))
+            if close_account_instructions:
+                forget_token_account(payer_keypair.pubkey(), token_address)
+            if wsol_token_account_instructions:
+                remember_token_account(payer_keypair.pubkey(), WSOL, wsol_token_account)
         else:
-            logging.error('Couldnt confirm transaction')
+            logging.error('Couldnt confirm transaction', extra={"signature": str(txn_sig), "mint": token_address})
+            if confirmed is False:
+                # a swap that failed on-chain usually means the cached pool keys went stale
+                invalidate_pool_keys(pool_keys["amm_id"])
         
         warning_text.value = "Processed txn"
         warning_text.update()
         await asyncio.sleep(5)
-        token_account, balance, balance_lamports, decimals = await get_token_account_info_from_rpc(payer_keypair, token_address)
+        token_account, balance, balance_lamports, decimals = await get_token_account_info(payer_keypair, token_address, refresh=True)
         if balance:
             token_balance_text.value = f"{balance}"
         else:
@@ -653,13 +923,10 @@ async def raydium_sell(token_address, payer_keypair, swap_col, warning_text, tok
     except Exception as e:
         logging.error(e)
 
-async def burn_tokens(token_address, payer_keypair, swap_col, warning_text, token_balance_text, page):
-    global global_decimals
-    amount_text_field = swap_col.controls[2]
-    compute_unit_limit_text_field = swap_col.controls[3]
-    compute_unit_price_text_field = swap_col.controls[4]
+async def burn_tokens(order, warning_text, token_balance_text, page):
+    token_address, payer_keypair = order["token_address"], order["payer_keypair"]
 
-    if not amount_text_field.value or float(amount_text_field.value) == 0:
+    if not order["amount"] or float(order["amount"]) == 0:
         warning_text.value = "Please enter a valid amount"
         warning_text.color = "RED"
         warning_text.update()
@@ -673,12 +940,12 @@ async def burn_tokens(token_address, payer_keypair, swap_col, warning_text, toke
     warning_text.update()
     
     try:
-        token_account, balance, balance_lamports, decimals = await get_token_account_info_from_rpc(payer_keypair, token_address)
-        if global_decimals is None:
+        token_account, balance, balance_lamports, decimals = await get_token_account_info(payer_keypair, token_address, refresh=True)
+        if decimals is None:
             logging.error("No decimals found")
             return
 
-        amount_in = int(float(amount_text_field.value) * (10 ** global_decimals))
+        amount_in = int(float(order["amount"]) * (10 ** decimals))
         instructions = [burn(BurnParams(
             amount=amount_in,
             account=token_account,
@@ -692,31 +959,25 @@ async def burn_tokens(token_address, payer_keypair, swap_col, warning_text, toke
         elif amount_in > int(balance_lamports):
             logging.error("Burn amount is greater than balance")
             return
-        
-        if compute_unit_limit_text_field.value and int(compute_unit_limit_text_field.value) != 0:
-            instructions.append(set_compute_unit_limit(int(compute_unit_limit_text_field.value)))
-        
-        if compute_unit_price_text_field.value and float(compute_unit_price_text_field.value) != 0:
-            instructions.append(set_compute_unit_price(int(compute_unit_price_text_field.value)))
+        instructions += compute_budget_instructions(order)
 
-        block_hash = await AsyncClient(rpc).get_latest_blockhash(commitment=Finalized)
-        transaction = VersionedTransaction(
-            MessageV0.try_compile(payer_keypair.pubkey(), instructions, [], block_hash.value.blockhash),
+        txn_sig, confirmed = await send_and_confirm(lambda blockhash: VersionedTransaction(
+            MessageV0.try_compile(payer_keypair.pubkey(), instructions, [], blockhash),
             [payer_keypair]
-        )
-
-        txn_sig = (await AsyncClient(rpc).send_transaction(transaction, opts=TxOpts(skip_preflight=True, preflight_commitment="processed"))).value
+        ))
 
-        if confirm_txn(txn_sig):
-            logging.info(f'Transaction landed: https://solscan.io/tx/{txn_sig}')
+        if confirmed:
+            logging.info(f'Transaction landed: {txn_sig}', extra={"signature": str(txn_sig), "mint": token_address})
             page.open(show_confirm_snackbar(txn_sig))
+            if amount_in == int(balance_lamports):
+                forget_token_account(payer_keypair.pubkey(), token_address)
         else:
-            logging.error('Couldnt confirm transaction')
+            logging.error('Couldnt confirm transaction', extra={"signature": str(txn_sig), "mint": token_address})
 
         warning_text.value = "Processed txn"
         warning_text.update()
         await asyncio.sleep(5)
-        token_account, balance, balance_lamports, decimals = await get_token_account_info_from_rpc(payer_keypair, token_address)
+        token_account, balance, balance_lamports, decimals = await get_token_account_info(payer_keypair, token_address, refresh=True)
         if balance:
             token_balance_text.value = f"{balance}"
         else:
@@ -730,38 +991,31 @@ async def burn_tokens(token_address, payer_keypair, swap_col, warning_text, toke
         logging.error(e)
 
 
-async def close_token_account(token_address, payer_keypair, swap_col, warning_text, token_balance_text, page):
+async def close_token_account(order, warning_text, token_balance_text, page):
+    token_address, payer_keypair = order["token_address"], order["payer_keypair"]
     warning_text.value = "Processing txn"
     warning_text.color = "#14F195"
     warning_text.update()
-    compute_unit_limit_text_field = swap_col.controls[3]
-    compute_unit_price_text_field = swap_col.controls[4]
-    
+
     try:
-        token_account, balance, balance_lamports, decimals = await get_token_account_info_from_rpc(payer_keypair, token_address)
+        token_account, balance, balance_lamports, decimals = await get_token_account_info(payer_keypair, token_address, refresh=True)
         instructions = [close_account(CloseAccountParams(TOKEN_PROGRAM, token_account, payer_keypair.pubkey(), payer_keypair.pubkey()))]
-        if compute_unit_limit_text_field.value and int(compute_unit_limit_text_field.value) != 0:
-            instructions.append(set_compute_unit_limit(int(compute_unit_limit_text_field.value)))
-        
-        if compute_unit_price_text_field.value and float(compute_unit_price_text_field.value) != 0:
-            instructions.append(set_compute_unit_price(int(compute_unit_price_text_field.value)))
-        block_hash = await AsyncClient(rpc).get_latest_blockhash(commitment=Finalized)
-        transaction = VersionedTransaction(
-            MessageV0.try_compile(payer_keypair.pubkey(), instructions, [], block_hash.value.blockhash),
+        instructions += compute_budget_instructions(order)
+        txn_sig, confirmed = await send_and_confirm(lambda blockhash: VersionedTransaction(
+            MessageV0.try_compile(payer_keypair.pubkey(), instructions, [], blockhash),
             [payer_keypair]
-        )
-        txn_sig = (await AsyncClient(rpc).send_transaction(transaction, opts=TxOpts(skip_preflight=True, preflight_commitment="processed"))).value
-        logging.info(f'txn_sig: {txn_sig}')
-        if confirm_txn(txn_sig):
-            logging.info(f'Transaction landed: https://solscan.io/tx/{txn_sig}')
+        ))
+        if confirmed:
+            logging.info(f'Transaction landed: {txn_sig}', extra={"signature": str(txn_sig), "mint": token_address})
             page.open(show_confirm_snackbar(txn_sig))
+            forget_token_account(payer_keypair.pubkey(), token_address)
         else:
-            logging.error('Couldn\'t confirm transaction')
+            logging.error('Couldn\'t confirm transaction', extra={"signature": str(txn_sig), "mint": token_address})
 
         warning_text.value = "Processed txn"
         warning_text.update()
         await asyncio.sleep(5)
-        token_account, balance, balance_lamports, decimals = await get_token_account_info_from_rpc(payer_keypair, token_address)
+        token_account, balance, balance_lamports, decimals = await get_token_account_info(payer_keypair, token_address, refresh=True)
         if balance:
             token_balance_text.value = f"{balance}"
         else: